@@ -84,6 +84,8 @@ def load_config():
     except (FileNotFoundError, json.JSONDecodeError) as err:
         CONFIG = {}
         logger.error(f"Failed to load or parse 'config.jsonc': {err}. Using default configuration.")
+    # Keep the image module's cached session values in step with reloads
+    image_generation.update_image_config(CONFIG)
 
 def load_model_map():
     """Load model mapping from models.json."""
@@ -376,7 +376,9 @@ async def chat_completions(request: Request):
         if not load_balancer:
             raise HTTPException(status_code=503, detail="Multi-instance system not initialized")
         
-        instance_id = await load_balancer.route_request(request_id, openai_data)
+        # The body was already read by request.json(), so this is the cached bytes
+        payload_size = len(await request.body())
+        instance_id = await load_balancer.route_request(request_id, openai_data, payload_size=payload_size)
         if not instance_id:
             raise HTTPException(status_code=503, detail="No available instances")
         
@@ -737,12 +739,20 @@ if __name__ == "__main__":
     host = gui_config.get('host', 'localhost')
     port = gui_config.get('port', 5104)
     
-    logger.info(f"🚀 Starting Multi-Instance LMArenaBridge Server on {host}:{port}")
+    # Prefer the libuv-based event loop when it is installed
+    try:
+        import uvloop  # noqa: F401
+        loop_impl = "uvloop"
+    except ImportError:
+        loop_impl = "asyncio"
+    
+    logger.info(f"🚀 Starting Multi-Instance LMArenaBridge Server on {host}:{port} (event loop: {loop_impl})")
     
     uvicorn.run(
         "api_server_multi:app",
         host=host,
         port=port,
         reload=False,
-        log_level="info"
+        log_level="info",
+        loop=loop_impl
     )
\ No newline at end of file
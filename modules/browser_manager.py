@@ -8,17 +8,32 @@ and communication with LMArena.ai for parallel processing.
 import asyncio
 import json
 import logging
+import re
 import uuid
 from datetime import datetime
 from typing import Optional, Dict, Any, Tuple
-from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Playwright
+from playwright.async_api import async_playwright, Browser, BrowserContext, CDPSession, ElementHandle, Frame, Page, Playwright
 
 logger = logging.getLogger(__name__)
 
+# ID patterns for LMArena API URLs
+_SESSION_RE = re.compile(r'session[_-]?id[=:]([a-f0-9-]+)', re.IGNORECASE)
+_MESSAGE_RE = re.compile(r'message[_-]?id[=:]([a-f0-9-]+)', re.IGNORECASE)
+
 
 class BrowserInstance:
     """Manages a single Playwright browser instance for LMArena communication."""
-    
+
+    # One instance lives per pool slot; slots drop the per-instance __dict__
+    __slots__ = (
+        'instance_id', 'config', 'playwright', 'browser', 'context', 'page',
+        'session_id', 'message_id', 'mode', 'battle_target', 'status',
+        '_last_activity', '_last_activity_iso', 'proxy_config', 'request_count',
+        'max_requests_per_session', 'session_lifetime', '_session_created_at',
+        '_session_created_at_iso', 'intercepted_requests', '_status_base',
+        '_input_handle', '_cdp'
+    )
+
     def __init__(self, instance_id: str, config: dict):
         self.instance_id = instance_id
         self.config = config
@@ -38,6 +53,35 @@ class BrowserInstance:
         self.session_lifetime = config.get('session_lifetime', 3600)  # seconds
         self.session_created_at = None
         self.intercepted_requests = []
+        self._input_handle: Optional[ElementHandle] = None
+        self._cdp: Optional[CDPSession] = None
+        
+        # Status fields that never change after construction
+        self._status_base = {
+            'instance_id': instance_id,
+            'mode': self.mode,
+            'battle_target': self.battle_target if self.mode == 'battle' else None,
+            'proxy_enabled': bool(self.proxy_config and self.proxy_config.get('enabled'))
+        }
+    
+    @property
+    def last_activity(self) -> Optional[datetime]:
+        return self._last_activity
+    
+    @last_activity.setter
+    def last_activity(self, value: Optional[datetime]):
+        # Format once on write so get_status doesn't pay isoformat() per poll
+        self._last_activity = value
+        self._last_activity_iso = value.isoformat() if value else None
+    
+    @property
+    def session_created_at(self) -> Optional[datetime]:
+        return self._session_created_at
+    
+    @session_created_at.setter
+    def session_created_at(self, value: Optional[datetime]):
+        self._session_created_at = value
+        self._session_created_at_iso = value.isoformat() if value else None
         
     async def initialize(self) -> bool:
         """Initialize the browser instance and navigate to LMArena."""
@@ -80,6 +124,7 @@ class BrowserInstance:
             
             self.context = await self.browser.new_context(**context_options)
             self.page = await self.context.new_page()
+            self.page.on('framenavigated', self._on_frame_navigated)
             
             # Set up request interception for session ID extraction
             await self._setup_request_interception()
@@ -103,6 +148,11 @@ class BrowserInstance:
             await self.cleanup()
             return False
     
+    def _on_frame_navigated(self, frame: Frame):
+        """Drop the cached input handle when the main frame navigates."""
+        if self.page and frame == self.page.main_frame:
+            self._input_handle = None
+    
     async def _setup_proxy(self) -> Optional[Dict[str, Any]]:
         """Set up proxy configuration for this instance."""
         if not self.proxy_config or not self.proxy_config.get('enabled'):
@@ -129,20 +179,20 @@ class BrowserInstance:
     
     async def _setup_request_interception(self):
         """Set up request interception to capture session and message IDs."""
+        # Chromium exposes raw CDP network events, which avoids routing every
+        # request through Playwright's interception proxy
+        if self.config.get('browser', {}).get('type', 'chromium') == 'chromium':
+            try:
+                await self._setup_cdp_listener()
+                return
+            except Exception as e:
+                logger.warning(f"[Instance {self.instance_id}] CDP setup failed, falling back to route interception: {e}")
+                self._cdp = None
+        
         async def handle_request(route):
             try:
                 request = route.request
-                url = request.url
-                # Capture LMArena API requests
-                if 'lmarena.ai' in url and ('/conversation' in url or '/chat' in url):
-                    self.intercepted_requests.append({
-                        'url': url,
-                        'method': request.method,
-                        'timestamp': datetime.now()
-                    })
-                    
-                    # Extract session_id and message_id from URL
-                    await self._extract_ids_from_url(url)
+                await self._capture_request(request.url, request.method)
                 
                 # Continue with the request
                 await route.continue_()
@@ -155,23 +205,58 @@ class BrowserInstance:
         
         await self.page.route('**/*', handle_request)
     
+    async def _setup_cdp_listener(self):
+        """Open a CDP session and subscribe to outgoing requests."""
+        self._cdp = await self.context.new_cdp_session(self.page)
+        
+        # Independent setup commands, pipelined in a single round-trip window
+        await asyncio.gather(
+            self._cdp.send('Network.enable'),
+            self._cdp.send('Page.enable'),
+            self._cdp.send('Network.setCacheDisabled', {'cacheDisabled': False})
+        )
+        
+        async def handle_request_will_be_sent(params: dict):
+            try:
+                request = params.get('request', {})
+                await self._capture_request(request.get('url', ''), request.get('method'))
+            except Exception as e:
+                logger.error(f"[Instance {self.instance_id}] Error in CDP request handler: {e}")
+        
+        self._cdp.on('Network.requestWillBeSent', handle_request_will_be_sent)
+    
+    async def _capture_request(self, url: str, method: Optional[str]):
+        """Record LMArena API requests and extract IDs from their URLs."""
+        # Capture LMArena API requests
+        if 'lmarena.ai' in url and ('/conversation' in url or '/chat' in url):
+            self.intercepted_requests.append({
+                'url': url,
+                'method': method,
+                'timestamp': datetime.now()
+            })
+            
+            # Extract session_id and message_id from URL
+            await self._extract_ids_from_url(url)
+    
     async def _extract_ids_from_url(self, url: str):
         """Extract session_id and message_id from intercepted request URLs."""
         try:
-            # Pattern matching for LMArena API URLs
-            import re
+            # Cheap substring checks first; most URLs carry neither ID
+            lowered = url.lower()
             
             # Look for session_id pattern
-            session_match = re.search(r'session[_-]?id[=:]([a-f0-9-]+)', url, re.IGNORECASE)
-            if session_match:
-                self.session_id = session_match.group(1)
-                logger.debug(f"[Instance {self.instance_id}] Extracted session_id: {self.session_id}")
+            if 'session' in lowered:
+                session_match = _SESSION_RE.search(url)
+                if session_match:
+                    self.session_id = session_match.group(1)
+                    logger.debug(f"[Instance {self.instance_id}] Extracted session_id: {self.session_id}")
             
             # Look for message_id pattern
-            message_match = re.search(r'message[_-]?id[=:]([a-f0-9-]+)', url, re.IGNORECASE)
-            if message_match:
-                self.message_id = message_match.group(1)
-                logger.debug(f"[Instance {self.instance_id}] Extracted message_id: {self.message_id}")
+            if 'message' in lowered:
+                message_match = _MESSAGE_RE.search(url)
+                if message_match:
+                    self.message_id = message_match.group(1)
+                    logger.debug(f"[Instance {self.instance_id}] Extracted message_id: {self.message_id}")
                 
         except Exception as e:
             logger.error(f"[Instance {self.instance_id}] Error extracting IDs from URL: {e}")
@@ -212,14 +297,23 @@ class BrowserInstance:
             
             # Select mode (direct_chat or battle)
             if self.mode == 'battle':
-                await self._setup_battle_mode()
+                interface_ready = await self._setup_battle_mode()
             else:
-                await self._setup_direct_chat_mode()
+                interface_ready = await self._setup_direct_chat_mode()
+            
+            # Without a chat input the instance can't serve requests, so fail it
+            # rather than sending a test message that can't go through
+            if not interface_ready:
+                logger.error(f"[Instance {self.instance_id}] Chat interface not found")
+                return False
             
             # Generate session IDs by sending a test message
-            success = await self._generate_session_ids()
+            result = await self._generate_session_ids()
             
-            return success
+            if result == 'needs_fallback':
+                return await self._setup_fallback_mode()
+            
+            return result == 'extracted'
             
         except Exception as e:
             logger.error(f"[Instance {self.instance_id}] Error during navigation and setup: {e}")
@@ -231,12 +325,7 @@ class BrowserInstance:
         try:
             logger.info(f"[Instance {self.instance_id}] Setting up fallback mode with generated IDs")
             
-            # Generate fallback session IDs
-            self.session_id = str(uuid.uuid4())
-            self.message_id = str(uuid.uuid4())
-            
-            logger.info(f"[Instance {self.instance_id}] Fallback session_id: {self.session_id}")
-            logger.info(f"[Instance {self.instance_id}] Fallback message_id: {self.message_id}")
+            self._assign_fallback_ids()
             
             # Mark as ready but in fallback mode
             self.status = 'ready_fallback'
@@ -247,7 +336,15 @@ class BrowserInstance:
             logger.error(f"[Instance {self.instance_id}] Error in fallback mode setup: {e}")
             return False
     
-    async def _setup_direct_chat_mode(self):
+    def _assign_fallback_ids(self):
+        """Generate random session and message IDs."""
+        self.session_id = str(uuid.uuid4())
+        self.message_id = str(uuid.uuid4())
+        
+        logger.info(f"[Instance {self.instance_id}] Fallback session_id: {self.session_id}")
+        logger.info(f"[Instance {self.instance_id}] Fallback message_id: {self.message_id}")
+    
+    async def _setup_direct_chat_mode(self) -> bool:
         """Set up direct chat mode."""
         try:
             # Look for direct chat button/link and click it
@@ -256,11 +353,13 @@ class BrowserInstance:
             
             # Wait for chat interface to be ready
             await self.page.wait_for_selector('textarea, input[type="text"]', timeout=10000)
+            return True
             
         except Exception as e:
             logger.warning(f"[Instance {self.instance_id}] Could not set up direct chat mode: {e}")
+            return False
     
-    async def _setup_battle_mode(self):
+    async def _setup_battle_mode(self) -> bool:
         """Set up battle mode."""
         try:
             logger.info(f"[Instance {self.instance_id}] Setting up battle mode (target: {self.battle_target})...")
@@ -270,12 +369,18 @@ class BrowserInstance:
             
             # Wait for battle interface to be ready
             await self.page.wait_for_selector('textarea, input[type="text"]', timeout=10000)
+            return True
             
         except Exception as e:
             logger.warning(f"[Instance {self.instance_id}] Could not set up battle mode: {e}")
+            return False
     
-    async def _generate_session_ids(self) -> bool:
-        """Generate session and message IDs by sending a test message."""
+    async def _generate_session_ids(self) -> str:
+        """Generate session and message IDs by sending a test message.
+        
+        Returns 'extracted' when both IDs were captured, 'needs_fallback' when
+        the test message went through but no IDs were seen, and 'failed' on error.
+        """
         try:
             logger.info(f"[Instance {self.instance_id}] Generating session IDs...")
             
@@ -283,6 +388,9 @@ class BrowserInstance:
             input_selector = 'textarea, input[type="text"]'
             await self.page.wait_for_selector(input_selector, timeout=10000)
             
+            # Resolve the input once per page lifetime; send_message reuses it
+            self._input_handle = await self.page.query_selector(input_selector)
+            
             # Send a test message to trigger ID generation
             test_message = "Hello"
             await self.page.fill(input_selector, test_message)
@@ -296,17 +404,14 @@ class BrowserInstance:
             # Check if we successfully extracted IDs
             if self.session_id and self.message_id:
                 logger.info(f"[Instance {self.instance_id}] Successfully generated session IDs")
-                return True
-            else:
-                # Fallback: generate UUIDs if extraction failed
-                self.session_id = str(uuid.uuid4())
-                self.message_id = str(uuid.uuid4())
-                logger.warning(f"[Instance {self.instance_id}] Using fallback UUID generation for session IDs")
-                return True
+                return 'extracted'
+            
+            logger.warning(f"[Instance {self.instance_id}] Could not extract session IDs from traffic")
+            return 'needs_fallback'
                 
         except Exception as e:
             logger.error(f"[Instance {self.instance_id}] Failed to generate session IDs: {e}")
-            return False
+            return 'failed'
     
     async def health_check(self) -> bool:
         """Perform health check on this instance."""
@@ -366,7 +471,12 @@ class BrowserInstance:
             self.session_created_at = datetime.now()
             
             # Generate new session IDs
-            success = await self._generate_session_ids()
+            result = await self._generate_session_ids()
+            
+            # Keep the current status; only the IDs fall back to random ones
+            if result == 'needs_fallback':
+                self._assign_fallback_ids()
+            success = result != 'failed'
             
             if success:
                 logger.info(f"[Instance {self.instance_id}] Session regenerated successfully")
@@ -383,19 +493,20 @@ class BrowserInstance:
             if self.status != 'ready':
                 return False
             
-            # Find message input
-            input_selector = 'textarea, input[type="text"]'
-            await self.page.wait_for_selector(input_selector, timeout=5000)
+            # Find message input, reusing the cached handle when still valid
+            if self._input_handle is None:
+                input_selector = 'textarea, input[type="text"]'
+                self._input_handle = await self.page.wait_for_selector(input_selector, timeout=5000)
             
             # Clear and fill message
-            await self.page.fill(input_selector, message)
+            await self._input_handle.fill(message)
             
             # Handle attachments if provided
             if attachments:
                 await self._handle_attachments(attachments)
             
             # Submit message
-            await self.page.keyboard.press('Enter')
+            await self._input_handle.press('Enter')
             
             # Update counters
             self.request_count += 1
@@ -405,6 +516,8 @@ class BrowserInstance:
             
         except Exception as e:
             logger.error(f"[Instance {self.instance_id}] Failed to send message: {e}")
+            # The handle may have been detached by a re-render; re-resolve next time
+            self._input_handle = None
             return False
     
     async def _handle_attachments(self, attachments: list):
@@ -422,29 +535,31 @@ class BrowserInstance:
     async def cleanup(self):
         """Clean up browser resources."""
         try:
+            if self._cdp:
+                try:
+                    await self._cdp.detach()
+                except Exception as e:
+                    logger.debug(f"[Instance {self.instance_id}] Error detaching CDP session: {e}")
+            
             # Unroute all routes first to prevent handler errors
             if self.page:
                 try:
                     await self.page.unroute('**/*')
                 except Exception as e:
                     logger.debug(f"[Instance {self.instance_id}] Error unrouting: {e}")
-                
-                try:
-                    await self.page.close()
-                except Exception as e:
-                    logger.debug(f"[Instance {self.instance_id}] Error closing page: {e}")
-            
-            if self.context:
-                try:
-                    await self.context.close()
-                except Exception as e:
-                    logger.debug(f"[Instance {self.instance_id}] Error closing context: {e}")
             
+            # Closing the browser closes its contexts and pages, and closing a
+            # context closes its pages, so only the outermost owner is closed
             if self.browser:
                 try:
                     await self.browser.close()
                 except Exception as e:
                     logger.debug(f"[Instance {self.instance_id}] Error closing browser: {e}")
+            elif self.context:
+                try:
+                    await self.context.close()
+                except Exception as e:
+                    logger.debug(f"[Instance {self.instance_id}] Error closing context: {e}")
             
             if self.playwright:
                 try:
@@ -460,16 +575,13 @@ class BrowserInstance:
     def get_status(self) -> Dict[str, Any]:
         """Get current status information for this instance."""
         return {
-            'instance_id': self.instance_id,
+            **self._status_base,
             'status': self.status,
-            'mode': self.mode,
-            'battle_target': self.battle_target if self.mode == 'battle' else None,
             'session_id': self.session_id,
             'message_id': self.message_id,
             'request_count': self.request_count,
-            'last_activity': self.last_activity.isoformat() if self.last_activity else None,
-            'session_created_at': self.session_created_at.isoformat() if self.session_created_at else None,
-            'proxy_enabled': bool(self.proxy_config and self.proxy_config.get('enabled'))
+            'last_activity': self._last_activity_iso,
+            'session_created_at': self._session_created_at_iso
         }
 
 
@@ -530,8 +642,10 @@ class BrowserManager:
     
     async def cleanup_all(self):
         """Cleanup all browser instances."""
-        for instance_id in list(self.instances.keys()):
-            await self.remove_instance(instance_id)
+        await asyncio.gather(
+            *(self.remove_instance(instance_id) for instance_id in list(self.instances.keys())),
+            return_exceptions=True
+        )
     
     def get_instance(self, instance_id: str) -> Optional[BrowserInstance]:
         """Get a specific browser instance."""
@@ -7,12 +7,25 @@ detects failures, and triggers recovery actions.
 
 import asyncio
 import logging
+import sys
 import time
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Callable
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Any, Callable
 
 logger = logging.getLogger(__name__)
 
+# asyncio.TaskGroup and asyncio.timeout() are only available on Python 3.11+
+_HAS_TASKGROUP = sys.version_info >= (3, 11)
+
+
+async def _with_timeout(coro, timeout: float):
+    """Await coro, raising asyncio.TimeoutError after timeout seconds."""
+    if _HAS_TASKGROUP:
+        async with asyncio.timeout(timeout):
+            return await coro
+    return await asyncio.wait_for(coro, timeout=timeout)
+
 
 class HealthMonitor:
     """Monitors health of browser instances and handles failures."""
@@ -28,6 +41,9 @@ class HealthMonitor:
         self.instance_timeout = self.instance_config.get('instance_timeout', 30)
         self.max_retries = self.instance_config.get('max_retries', 3)
         
+        # Caps in-flight health probes so large fleets don't flood the event loop
+        self._health_sem = asyncio.Semaphore(self.instance_config.get('max_concurrent_checks', 20))
+        
         # Alert thresholds
         alert_thresholds = self.monitoring_config.get('alert_thresholds', {})
         self.response_time_threshold = alert_thresholds.get('response_time', 10)
@@ -37,9 +53,20 @@ class HealthMonitor:
         # Monitoring state
         self.is_monitoring = False
         self.health_check_task = None
-        self.instance_health_history: Dict[str, List[dict]] = {}
-        self.system_health_history = []
-        self.alert_callbacks: List[Callable] = []
+        self.instance_health_history: Dict[str, Deque[dict]] = {}
+        self.system_health_history: Deque[dict] = deque(maxlen=10000)
+        # Response times of the last 10 healthy checks per instance, plus a
+        # running total/count across all windows
+        self._rt_window: Dict[str, Deque[float]] = {}
+        self._rt_total = 0.0
+        self._rt_count = 0
+        # Registered callback -> coroutine function invoked on alerts. Keyed by
+        # the callback itself rather than id() so a bound method passed again
+        # (a fresh object each access) still matches on removal.
+        self.alert_callbacks: Dict[Callable, Callable] = {}
+        
+        # (instance_id, instance) pairs captured once per monitoring cycle
+        self._cycle_snapshot: tuple = ()
         
         # Metrics
         self.total_health_checks = 0
@@ -76,6 +103,8 @@ class HealthMonitor:
         """Main monitoring loop."""
         try:
             while self.is_monitoring:
+                # One snapshot shared by the checks and the analysis of this cycle
+                self._cycle_snapshot = tuple(self.coordinator.browser_manager.instances.items())
                 await self._perform_health_checks()
                 await self._analyze_system_health()
                 await self._cleanup_old_data()
@@ -84,7 +113,7 @@ class HealthMonitor:
         except asyncio.CancelledError:
             logger.info("[HealthMonitor] Monitoring loop cancelled")
         except Exception as e:
-            logger.error(f"[HealthMonitor] Error in monitoring loop: {e}")
+            logger.error("[HealthMonitor] Error in monitoring loop: %s", e)
             # Restart monitoring after a delay
             await asyncio.sleep(5)
             if self.is_monitoring:
@@ -93,42 +122,59 @@ class HealthMonitor:
     async def _perform_health_checks(self):
         """Perform health checks on all instances."""
         try:
-            # Get all instances from coordinator
-            all_instances = self.coordinator.browser_manager.get_all_instances()
+            # Instances captured for this monitoring cycle
+            snapshot = self._cycle_snapshot
             
-            if not all_instances:
+            if not snapshot:
                 logger.debug("[HealthMonitor] No instances to check")
                 return
             
-            # Perform health checks concurrently
-            health_check_tasks = []
-            for instance_id, instance in all_instances.items():
-                task = asyncio.create_task(
-                    self._check_instance_health(instance_id, instance)
+            # Perform health checks concurrently, bounded by the semaphore
+            instance_ids = tuple(instance_id for instance_id, _ in snapshot)
+            if _HAS_TASKGROUP:
+                # Structured: stopping the monitor mid-cycle cancels every check
+                async with asyncio.TaskGroup() as tg:
+                    tasks = [
+                        tg.create_task(self._bounded_check(instance_id, instance))
+                        for instance_id, instance in snapshot
+                    ]
+                results = [task.result() for task in tasks]
+            else:
+                results = await asyncio.gather(
+                    *(self._bounded_check(instance_id, instance) for instance_id, instance in snapshot),
+                    return_exceptions=True
                 )
-                health_check_tasks.append(task)
-            
-            # Wait for all health checks to complete
-            results = await asyncio.gather(*health_check_tasks, return_exceptions=True)
             
             # Process results
             for i, result in enumerate(results):
                 if isinstance(result, Exception):
-                    instance_id = list(all_instances.keys())[i]
-                    logger.error(f"[HealthMonitor] Health check failed for {instance_id}: {result}")
+                    instance_id = instance_ids[i]
+                    logger.error("[HealthMonitor] Health check failed for %s: %s", instance_id, result)
                     await self._handle_instance_failure(instance_id, str(result))
             
-            self.total_health_checks += len(all_instances)
+            self.total_health_checks += len(snapshot)
             
         except Exception as e:
             logger.error(f"[HealthMonitor] Error performing health checks: {e}")
     
+    async def _bounded_check(self, instance_id: str, instance):
+        """Check instance health while holding a concurrency slot.
+        
+        Errors are returned rather than raised so one failing check never
+        cancels its siblings in the task group.
+        """
+        try:
+            async with self._health_sem:
+                return await self._check_instance_health(instance_id, instance)
+        except Exception as e:
+            return e
+    
     async def _check_instance_health(self, instance_id: str, instance) -> dict:
         """Check health of a specific instance."""
-        start_time = time.time()
+        start_time = time.monotonic()
         health_result = {
             'instance_id': instance_id,
-            'timestamp': datetime.now(),
+            'ts_mono': start_time,
             'healthy': False,
             'response_time': 0.0,
             'error': None,
@@ -137,16 +183,16 @@ class HealthMonitor:
         
         try:
             # Perform the actual health check with timeout
-            health_check_task = asyncio.create_task(instance.health_check())
-            
             try:
-                is_healthy = await asyncio.wait_for(
-                    health_check_task, 
-                    timeout=self.instance_timeout
-                )
+                is_healthy = await _with_timeout(instance.health_check(), self.instance_timeout)
+                
+            except asyncio.TimeoutError:
+                health_result['error'] = f"Health check timeout ({self.instance_timeout}s)"
+                await self._handle_instance_failure(instance_id, health_result['error'])
                 
+            else:
                 health_result['healthy'] = is_healthy
-                health_result['response_time'] = time.time() - start_time
+                health_result['response_time'] = time.monotonic() - start_time
                 
                 # Get additional instance details
                 health_result['details'] = {
@@ -161,13 +207,9 @@ class HealthMonitor:
                 else:
                     await self._handle_instance_failure(instance_id, "Health check returned false")
                 
-            except asyncio.TimeoutError:
-                health_result['error'] = f"Health check timeout ({self.instance_timeout}s)"
-                await self._handle_instance_failure(instance_id, health_result['error'])
-                
         except Exception as e:
             health_result['error'] = str(e)
-            health_result['response_time'] = time.time() - start_time
+            health_result['response_time'] = time.monotonic() - start_time
             await self._handle_instance_failure(instance_id, str(e))
         
         # Record health check result
@@ -179,20 +221,21 @@ class HealthMonitor:
         """Record a successful health check."""
         # Check if instance was previously unhealthy
         if instance_id in self.coordinator.unhealthy_instances:
-            logger.info(f"[HealthMonitor] Instance {instance_id} recovered")
+            logger.info("[HealthMonitor] Instance %s recovered", instance_id)
             self.instances_recovered += 1
             await self._trigger_alert('instance_recovered', {
                 'instance_id': instance_id,
-                'recovery_time': datetime.now()
+                'recovery_time': datetime.now().isoformat()
             })
         
-        # Update coordinator state
-        self.coordinator.healthy_instances.add(instance_id)
+        # Update coordinator state; warm instances stay out of rotation until promoted
+        if instance_id not in self.coordinator.warm_instances:
+            self.coordinator.healthy_instances.add(instance_id)
         self.coordinator.unhealthy_instances.discard(instance_id)
     
     async def _handle_instance_failure(self, instance_id: str, error: str):
         """Handle instance failure."""
-        logger.warning(f"[HealthMonitor] Instance {instance_id} failed health check: {error}")
+        logger.warning("[HealthMonitor] Instance %s failed health check: %s", instance_id, error)
         
         # Check if this is a new failure
         was_healthy = instance_id in self.coordinator.healthy_instances
@@ -209,7 +252,7 @@ class HealthMonitor:
             await self._trigger_alert('instance_failed', {
                 'instance_id': instance_id,
                 'error': error,
-                'failure_time': datetime.now()
+                'failure_time': datetime.now().isoformat()
             })
             
             # Check if we need to create replacement instances
@@ -237,22 +280,24 @@ class HealthMonitor:
     
     def _record_health_check(self, instance_id: str, health_result: dict):
         """Record health check result in history."""
-        if instance_id not in self.instance_health_history:
-            self.instance_health_history[instance_id] = []
-        
-        self.instance_health_history[instance_id].append(health_result)
-        
         # Keep only recent history (last 100 checks per instance)
-        if len(self.instance_health_history[instance_id]) > 100:
-            self.instance_health_history[instance_id] = self.instance_health_history[instance_id][-100:]
+        self.instance_health_history.setdefault(instance_id, deque(maxlen=100)).append(health_result)
+        
+        if health_result['healthy'] and health_result['response_time'] > 0:
+            window = self._rt_window.setdefault(instance_id, deque(maxlen=10))
+            if len(window) == window.maxlen:
+                # The oldest sample is about to be evicted by append()
+                self._rt_total -= window[0]
+            else:
+                self._rt_count += 1
+            window.append(health_result['response_time'])
+            self._rt_total += health_result['response_time']
     
     async def _analyze_system_health(self):
         """Analyze overall system health and trigger alerts if needed."""
         try:
-            current_time = datetime.now()
-            
             # Calculate system metrics
-            total_instances = len(self.coordinator.browser_manager.instances)
+            total_instances = len(self._cycle_snapshot)
             healthy_instances = len(self.coordinator.healthy_instances)
             unhealthy_instances = len(self.coordinator.unhealthy_instances)
             
@@ -263,20 +308,11 @@ class HealthMonitor:
             failure_rate = unhealthy_instances / total_instances
             
             # Calculate average response time
-            recent_checks = []
-            for instance_history in self.instance_health_history.values():
-                recent_checks.extend([
-                    check for check in instance_history[-10:]  # Last 10 checks
-                    if check['healthy'] and check['response_time'] > 0
-                ])
-            
-            avg_response_time = 0.0
-            if recent_checks:
-                avg_response_time = sum(check['response_time'] for check in recent_checks) / len(recent_checks)
+            avg_response_time = self._rt_total / self._rt_count if self._rt_count else 0.0
             
             # Record system health
             system_health = {
-                'timestamp': current_time,
+                'ts_mono': time.monotonic(),
                 'total_instances': total_instances,
                 'healthy_instances': healthy_instances,
                 'unhealthy_instances': unhealthy_instances,
@@ -319,54 +355,66 @@ class HealthMonitor:
     
     async def _trigger_alert(self, alert_type: str, data: dict):
         """Trigger an alert."""
+        # Nothing would consume the alert, so skip building it
+        if not self.alert_callbacks and not logger.isEnabledFor(logging.WARNING):
+            return
+        
         alert = {
             'type': alert_type,
-            'timestamp': datetime.now(),
+            'timestamp': datetime.now().isoformat(),
             'data': data
         }
         
-        logger.warning(f"[HealthMonitor] ALERT: {alert_type} - {data}")
+        logger.warning("[HealthMonitor] ALERT: %s - %s", alert_type, data)
         
-        # Call registered alert callbacks
-        for callback in self.alert_callbacks:
-            try:
-                if asyncio.iscoroutinefunction(callback):
-                    await callback(alert)
-                else:
-                    callback(alert)
-            except Exception as e:
-                logger.error(f"[HealthMonitor] Error in alert callback: {e}")
+        # Call registered alert callbacks concurrently
+        if self.alert_callbacks:
+            results = await asyncio.gather(
+                *(callback(alert) for callback in self.alert_callbacks.values()),
+                return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error(f"[HealthMonitor] Error in alert callback: {result}")
     
     def add_alert_callback(self, callback: Callable):
-        """Add an alert callback function."""
-        self.alert_callbacks.append(callback)
+        """Add an alert callback function.
+        
+        Plain functions are run in the default thread pool via asyncio.to_thread
+        so they can't block the event loop.
+        """
+        if asyncio.iscoroutinefunction(callback):
+            self.alert_callbacks[callback] = callback
+        else:
+            self.alert_callbacks[callback] = lambda alert, _cb=callback: asyncio.to_thread(_cb, alert)
     
     def remove_alert_callback(self, callback: Callable):
         """Remove an alert callback function."""
-        if callback in self.alert_callbacks:
-            self.alert_callbacks.remove(callback)
+        self.alert_callbacks.pop(callback, None)
     
     async def _cleanup_old_data(self):
         """Clean up old monitoring data."""
         try:
-            cutoff_time = datetime.now() - timedelta(hours=24)
+            cutoff_time = time.monotonic() - 86400.0
             
-            # Clean up system health history
-            self.system_health_history = [
-                record for record in self.system_health_history
-                if record['timestamp'] > cutoff_time
-            ]
+            # Histories are append-ordered, so only the expired prefix is touched
+            history = self.system_health_history
+            while history and history[0]['ts_mono'] <= cutoff_time:
+                history.popleft()
             
             # Clean up instance health history
             for instance_id in list(self.instance_health_history.keys()):
-                self.instance_health_history[instance_id] = [
-                    check for check in self.instance_health_history[instance_id]
-                    if check['timestamp'] > cutoff_time
-                ]
+                history = self.instance_health_history[instance_id]
+                while history and history[0]['ts_mono'] <= cutoff_time:
+                    history.popleft()
                 
                 # Remove empty histories
-                if not self.instance_health_history[instance_id]:
+                if not history:
                     del self.instance_health_history[instance_id]
+                    window = self._rt_window.pop(instance_id, None)
+                    if window:
+                        self._rt_total -= sum(window)
+                        self._rt_count -= len(window)
                     
         except Exception as e:
             logger.error(f"[HealthMonitor] Error cleaning up old data: {e}")
@@ -385,13 +433,22 @@ class HealthMonitor:
     
     def get_instance_health_history(self, instance_id: str, limit: int = 50) -> List[dict]:
         """Get health history for a specific instance."""
-        history = self.instance_health_history.get(instance_id, [])
-        return history[-limit:] if limit else history
+        history = list(self.instance_health_history.get(instance_id, ()))
+        return self._with_wall_time(history[-limit:] if limit else history)
     
     def get_system_health_history(self, limit: int = 100) -> List[dict]:
         """Get system health history."""
-        history = self.system_health_history
-        return history[-limit:] if limit else history
+        history = list(self.system_health_history)
+        return self._with_wall_time(history[-limit:] if limit else history)
+    
+    @staticmethod
+    def _with_wall_time(records: List[dict]) -> List[dict]:
+        """Add an ISO 'timestamp' derived from each record's monotonic time."""
+        offset = time.time() - time.monotonic()
+        return [
+            {**record, 'timestamp': datetime.fromtimestamp(record['ts_mono'] + offset).isoformat()}
+            for record in records
+        ]
     
     def get_metrics_summary(self) -> Dict[str, Any]:
         """Get summary of health monitoring metrics."""
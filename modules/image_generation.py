@@ -2,11 +2,19 @@
 
 import asyncio
 import json
-import re
 import time
 import uuid
 from typing import AsyncGenerator
 
+try:
+    import orjson
+
+    def _dumps(obj) -> str:
+        # Sent as a text frame: the userscript JSON.parses event.data
+        return orjson.dumps(obj).decode()
+except ImportError:
+    _dumps = json.dumps
+
 # Global variables, will be passed from main service later
 logger = None
 response_channels = None
@@ -14,32 +22,83 @@ CONFIG = None
 MODEL_NAME_TO_ID_MAP = None
 DEFAULT_MODEL_ID = None
 
+# Config values read on every request, snapshotted by update_image_config
+_STREAM_TIMEOUT = 360
+_SESSION_ID = None
+_MESSAGE_ID = None
+
+# Invariant parts of the image request payload, shared by every request
+_BASE_MESSAGE_TEMPLATE = {"role": "user", "participantPosition": "a"}
+_BASE_PAYLOAD = {"is_image_request": True}
+# Consumed bytes are only dropped from the buffer once this many accumulate
+_BUFFER_COMPACT_THRESHOLD = 64 * 1024
+
 
 def initialize_image_module(app_logger, channels, app_config, model_map, default_model_id):
     """Initialize global variables required by the module."""
-    global logger, response_channels, CONFIG, MODEL_NAME_TO_ID_MAP, DEFAULT_MODEL_ID
+    global logger, response_channels, MODEL_NAME_TO_ID_MAP, DEFAULT_MODEL_ID
     logger = app_logger
     response_channels = channels
-    CONFIG = app_config
     MODEL_NAME_TO_ID_MAP = model_map
     DEFAULT_MODEL_ID = default_model_id
+    update_image_config(app_config)
     logger.info("Text-to-image module successfully initialized.")
 
+def update_image_config(app_config):
+    """Refresh the cached config values after the main service reloads its config."""
+    global CONFIG, _STREAM_TIMEOUT, _SESSION_ID, _MESSAGE_ID
+    CONFIG = app_config
+    _STREAM_TIMEOUT = app_config.get("stream_response_timeout_seconds", 360)
+    _SESSION_ID = app_config.get("session_id")
+    _MESSAGE_ID = app_config.get("message_id")
+
 def convert_to_lmarena_image_payload(prompt: str, model_id: str, session_id: str, message_id: str) -> dict:
     """Convert text prompt to LMArena image generation payload."""
     return {
-        "is_image_request": True,
-        "message_templates": [{
-            "role": "user",
-            "content": prompt,
-            "attachments": [],
-            "participantPosition": "a"
-        }],
+        **_BASE_PAYLOAD,
+        "message_templates": [{**_BASE_MESSAGE_TEMPLATE, "content": prompt, "attachments": []}],
         "target_model_id": model_id,
         "session_id": session_id,
         "message_id": message_id
     }
 
+def _parse_stream_line(line: bytes):
+    """Classify one `<prefix>:<json>` stream record.
+
+    Returns ('image', url), ('finish', reason), ('error', message) or None.
+    """
+    prefix = line[:2]
+    if prefix in (b'a2', b'b2'):
+        try:
+            image_data_list = json.loads(line[3:])
+        except json.JSONDecodeError as e:
+            logger.error(f"Error parsing image URL: {e}, data: {line[3:]}")
+            return None
+        if isinstance(image_data_list, list) and image_data_list and isinstance(image_data_list[0], dict):
+            image_info = image_data_list[0]
+            if image_info.get("type") == "image" and "image" in image_info:
+                return 'image', image_info["image"]
+        return None
+    
+    if prefix in (b'ad', b'bd'):
+        try:
+            finish_data = json.loads(line[3:])
+        except json.JSONDecodeError:
+            return None
+        if isinstance(finish_data, dict) and "finishReason" in finish_data:
+            return 'finish', finish_data["finishReason"]
+        return None
+    
+    # Generic error records are bare JSON objects mentioning "error" or "context_file"
+    if line[:1] == b'{' and (b'"error"' in line or b'"context_file"' in line):
+        try:
+            error_json = json.loads(line)
+        except json.JSONDecodeError:
+            return None
+        if isinstance(error_json, dict):
+            return 'error', error_json.get("error", "Unknown error from LMArena")
+    return None
+
 async def _process_image_stream(request_id: str) -> AsyncGenerator[tuple[str, str], None]:
     """Process image generation data stream from browser and generate structured events."""
     queue = response_channels.get(request_id)
@@ -48,15 +107,13 @@ async def _process_image_stream(request_id: str) -> AsyncGenerator[tuple[str, st
         yield 'error', 'Internal server error: response channel not found.'
         return
 
-    buffer = ""
-    timeout = CONFIG.get("stream_response_timeout_seconds", 360)
-    # Generalized regex to match a or b prefix
-    image_pattern = re.compile(r'[ab]2:(\[.*?\])')
-    finish_pattern = re.compile(r'[ab]d:(\{.*?"finishReason".*?\})')
-    # Generic error matching, can capture JSON objects containing "error" or "context_file"
-    error_pattern = re.compile(r'(\{\s*".*?"\s*:\s*".*?"(error|context_file).*?"\s*\})', re.DOTALL | re.IGNORECASE)
+    buffer = bytearray()
+    # Offset of the first byte of the next unprocessed line in buffer
+    line_start = 0
+    timeout = _STREAM_TIMEOUT
     
     found_image_url = None # Used to store the found URL
+    finished = False # Whether a finish record has been seen
 
     try:
         while True:
@@ -71,45 +128,66 @@ async def _process_image_stream(request_id: str) -> AsyncGenerator[tuple[str, st
                     yield 'error', f'Response timed out after {timeout} seconds.'
                 return
 
-            if isinstance(raw_data, dict) and 'error' in raw_data:
-                yield 'error', raw_data.get('error', 'Unknown browser error')
-                return
+            # Drain everything already queued so one wakeup handles the whole batch
+            pending = [raw_data]
+            while True:
+                try:
+                    pending.append(queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
             
-            # [DONE] is the end signal of the stream
-            if raw_data == "[DONE]":
-                break
-
-            buffer += "".join(str(item) for item in raw_data) if isinstance(raw_data, list) else raw_data
+            done = False
+            for raw_data in pending:
+                if isinstance(raw_data, dict) and 'error' in raw_data:
+                    yield 'error', raw_data.get('error', 'Unknown browser error')
+                    return
+                
+                # [DONE] is the end signal of the stream
+                if raw_data == "[DONE]":
+                    # Terminate a trailing record that arrived without a newline
+                    buffer.extend(b'\n')
+                    done = True
+                    break
+                
+                # Extend in place; rebuilding an immutable str per chunk is quadratic
+                if isinstance(raw_data, list):
+                    for item in raw_data:
+                        buffer.extend(item.encode() if isinstance(item, str) else str(item).encode())
+                else:
+                    buffer.extend(raw_data.encode())
             
-            if (error_match := error_pattern.search(buffer)):
-                try:
-                    error_json = json.loads(error_match.group(1))
-                    yield 'error', error_json.get("error", "Unknown error from LMArena")
+            # Single pass over the newly completed lines
+            while (idx := buffer.find(b'\n', line_start)) != -1:
+                event = _parse_stream_line(bytes(buffer[line_start:idx]).strip())
+                line_start = idx + 1
+                if event is None:
+                    continue
+                
+                event_type, data = event
+                if event_type == 'error':
+                    yield 'error', data
                     return
-                except json.JSONDecodeError: pass
-
-            # Only match when URL has not been found yet
-            if not found_image_url:
-                while (match := image_pattern.search(buffer)):
-                    try:
-                        image_data_list = json.loads(match.group(1))
-                        if isinstance(image_data_list, list) and image_data_list:
-                            image_info = image_data_list[0]
-                            if image_info.get("type") == "image" and "image" in image_info:
-                                found_image_url = image_info["image"]
-                                # After finding, no longer continue searching for images in this buffer
-                                buffer = buffer[match.end():]
-                                break
-                    except (json.JSONDecodeError, IndexError) as e:
-                        logger.error(f"Error parsing image URL: {e}, buffer: {buffer}")
-                    buffer = buffer[match.end():]
-
-            if (finish_match := finish_pattern.search(buffer)):
-                try:
-                    finish_data = json.loads(finish_match.group(1))
-                    yield 'finish', finish_data.get("finishReason", "stop")
-                except (json.JSONDecodeError, IndexError): pass
-                buffer = buffer[finish_match.end():]
+                if event_type == 'image':
+                    # Keep the first image URL found
+                    if not found_image_url:
+                        found_image_url = data
+                elif event_type == 'finish':
+                    yield 'finish', data
+                    finished = True
+                
+                # Image and finish reason both known: the rest of the stream is
+                # trailing telemetry, so stop without waiting for [DONE]
+                if finished and found_image_url:
+                    yield 'image_url', found_image_url
+                    return
+            
+            if done:
+                break
+            
+            # Drop consumed lines only once enough have accumulated
+            if line_start > _BUFFER_COMPACT_THRESHOLD:
+                del buffer[:line_start]
+                line_start = 0
         
         # After loop ends, yield final result based on whether URL was found
         if found_image_url:
@@ -121,10 +199,7 @@ async def _process_image_stream(request_id: str) -> AsyncGenerator[tuple[str, st
 
     except asyncio.CancelledError:
         logger.info(f"IMAGE PROCESSOR [ID: {request_id[:8]}]: Task was cancelled.")
-    finally:
-        if request_id in response_channels:
-            del response_channels[request_id]
-            logger.info(f"IMAGE PROCESSOR [ID: {request_id[:8]}]: Response channel cleaned up.")
+        raise
 
 
 async def generate_single_image(prompt: str, model_name: str, browser_ws) -> str | dict:
@@ -135,13 +210,15 @@ async def generate_single_image(prompt: str, model_name: str, browser_ws) -> str
         return {"error": "Browser client not connected."}
 
     target_model_id = None # Force modelId to be null
-    session_id = CONFIG.get("session_id")
-    message_id = CONFIG.get("message_id")
+    session_id = _SESSION_ID
+    message_id = _MESSAGE_ID
 
     if not session_id or not message_id or "YOUR_" in session_id or "YOUR_" in message_id:
         return {"error": "Session ID or Message ID is not configured."}
 
-    request_id = str(uuid.uuid4())
+    request_id = uuid.uuid4().hex
+    # Unbounded like the chat channels: the shared WebSocket reader puts into every
+    # channel, so a full queue here would stall delivery to all other requests
     response_channels[request_id] = asyncio.Queue()
 
     try:
@@ -149,7 +226,7 @@ async def generate_single_image(prompt: str, model_name: str, browser_ws) -> str
         message_to_browser = {"request_id": request_id, "payload": lmarena_payload}
         
         logger.info(f"IMAGE GEN (SINGLE) [ID: {request_id[:8]}]: Sending request...")
-        await browser_ws.send_text(json.dumps(message_to_browser))
+        await browser_ws.send_text(_dumps(message_to_browser))
 
         # _process_image_stream now only yields 'image_url' or 'error' or 'finish'
         async for event_type, data in _process_image_stream(request_id):
@@ -169,9 +246,30 @@ async def generate_single_image(prompt: str, model_name: str, browser_ws) -> str
 
     except Exception as e:
         logger.error(f"IMAGE GEN (SINGLE) [ID: {request_id[:8]}]: Fatal error occurred during processing: {e}", exc_info=True)
-        if request_id in response_channels:
-            del response_channels[request_id]
         return {"error": "An internal server error occurred."}
+    finally:
+        # Single cleanup path for success, error, early return and cancellation
+        if response_channels.pop(request_id, None) is not None:
+            logger.info(f"IMAGE GEN (SINGLE) [ID: {request_id[:8]}]: Response channel cleaned up.")
+
+
+async def _generate_first_image(prompt: str, model_name: str, browser_ws, n: int) -> list:
+    """Race n generation tasks and cancel the rest once one yields an image URL."""
+    tasks = [asyncio.create_task(generate_single_image(prompt, model_name, browser_ws)) for _ in range(n)]
+    results = []
+    try:
+        for fut in asyncio.as_completed(tasks):
+            res = await fut
+            results.append(res)
+            if isinstance(res, str):
+                break
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        # Drain cancelled tasks so their channels are cleaned up before returning
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return results
 
 
 async def handle_image_generation_request(request, browser_ws):
@@ -190,12 +288,17 @@ async def handle_image_generation_request(request, browser_ws):
         return {"error": "Parameter 'n' must be an integer between 1 and 10."}, 400
 
     model_name = req_body.get("model", "dall-e-3")
+    # Return as soon as any task produces an image instead of waiting for all n
+    return_first = bool(req_body.get("return_first", False))
 
     logger.info(f"Received text-to-image request: n={n}, prompt='{prompt[:30]}...'")
 
-    # Create n parallel tasks
-    tasks = [generate_single_image(prompt, model_name, browser_ws) for _ in range(n)]
-    results = await asyncio.gather(*tasks)
+    if return_first and n > 1:
+        results = await _generate_first_image(prompt, model_name, browser_ws, n)
+    else:
+        # Create n parallel tasks
+        tasks = [generate_single_image(prompt, model_name, browser_ws) for _ in range(n)]
+        results = await asyncio.gather(*tasks)
 
     successful_urls = [res for res in results if isinstance(res, str)]
     errors = [res['error'] for res in results if isinstance(res, dict)]
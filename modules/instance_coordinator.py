@@ -6,14 +6,73 @@ and manages the lifecycle of browser instances.
 """
 
 import asyncio
+import heapq
 import logging
+import math
 import time
+from collections import deque
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 from .browser_manager import BrowserManager, BrowserInstance
 
 logger = logging.getLogger(__name__)
 
+# Weight of the newest sample in the arrival-rate and response-time averages
+_RATE_EWMA_ALPHA = 0.3
+# Weight of the newest sample in the smoothed load fed to the scaling thresholds
+_LOAD_EWMA_ALPHA = 0.1
+# Seconds a status snapshot may be served to pollers before it is rebuilt
+_STATUS_CACHE_TTL = 0.5
+
+
+class _VersionedSet(set):
+    """A set that counts membership changes so readers can cache snapshots of it."""
+    
+    __slots__ = ('version',)
+    
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.version = 0
+    
+    def add(self, item):
+        if item not in self:
+            super().add(item)
+            self.version += 1
+    
+    def discard(self, item):
+        if item in self:
+            super().discard(item)
+            self.version += 1
+    
+    def remove(self, item):
+        super().remove(item)
+        self.version += 1
+    
+    def pop(self):
+        item = super().pop()
+        self.version += 1
+        return item
+    
+    def clear(self):
+        super().clear()
+        self.version += 1
+    
+    def update(self, *others):
+        super().update(*others)
+        self.version += 1
+    
+    def difference_update(self, *others):
+        super().difference_update(*others)
+        self.version += 1
+    
+    def __ior__(self, other):
+        self.update(other)
+        return self
+    
+    def __isub__(self, other):
+        self.difference_update(other)
+        return self
+
 
 class InstanceCoordinator:
     """Coordinates multiple browser instances and handles scaling."""
@@ -24,42 +83,96 @@ class InstanceCoordinator:
         self.instance_config = config.get('instances', {})
         self.browser_config = config.get('browser', {})
         self.instance_defaults = config.get('instance_defaults', {})
+        # Shared part of every new instance's config, merged once
+        self._base_config = {**self.instance_defaults, **self.browser_config}
         
         # Scaling configuration
         self.min_instances = self.instance_config.get('min_instances', 1)
         self.max_instances = self.instance_config.get('max_instances', 5)
         self.initial_count = self.instance_config.get('initial_count', 1)
-        self.auto_scale = self.instance_config.get('auto_scale', True)
+        self.auto_scale = self.instance_config.get('auto_scale', False)
         self.scale_up_threshold = self.instance_config.get('scale_up_threshold', 0.8)
         self.scale_down_threshold = self.instance_config.get('scale_down_threshold', 0.3)
+        self.warm_pool_size = self.instance_config.get('warm_pool_size', 0)
+        self.load_balancing = self.instance_config.get('load_balancing', 'least_busy')
         
         # Request tracking
-        self.request_queue = asyncio.Queue()
         self.active_requests: Dict[str, dict] = {}
-        self.request_history = []
+        # (monotonic time, response time, success, instance id) of recent completions
+        self.request_history: deque = deque(maxlen=10000)
+        # Active request count per instance, kept in step with active_requests
+        self._load: Dict[str, int] = {}
+        # Instance ids bucketed by load; _min_bucket is the lowest non-empty one
+        self._buckets: List[set] = [set()]
+        self._min_bucket = 0
+        # (average response time, instance id) min-heap; superseded entries are
+        # discarded lazily when they surface at the top
+        self._rt_heap: List[tuple] = []
+        # Round-robin rotation; an instance appears once per unit of weight
+        self._rr_deque: deque = deque()
+        
+        # Selection strategy name -> selector, resolved once instead of per request
+        self._selectors = {
+            'round_robin': self._round_robin_selection,
+            'least_busy': self._least_busy_selection,
+            'response_time': self._fastest_response_selection
+        }
         
         # Instance health tracking
-        self.healthy_instances: set = set()
+        self.healthy_instances: set = _VersionedSet()
         self.unhealthy_instances: set = set()
         self.instance_metrics: Dict[str, dict] = {}
+        # Launched instances held back from routing until a scale-up promotes them
+        self.warm_instances: deque = deque()
+        self._warm_task: Optional[asyncio.Task] = None
+        # Browser launches in flight, counted against max_instances
+        self._launching = 0
+        
+        # (monotonic time, value) snapshots served to status pollers
+        self._status_cache: Optional[tuple] = None
+        self._instance_list_cache: Optional[tuple] = None
         
         # Scaling state
         self.last_scale_action = None
         self.scale_cooldown = 60  # seconds
+        self.scale_check_interval = self.instance_config.get('scale_check_interval', 10)
+        self._maintenance_task: Optional[asyncio.Task] = None
+        # Surges are answered quickly; dips must persist before capacity is shed
+        self.scale_up_cooldown = self.instance_config.get('scale_up_cooldown', self.scale_cooldown)
+        self.scale_down_cooldown = self.instance_config.get('scale_down_cooldown', self.scale_cooldown)
+        # Monotonic times of the last scale action in each direction
+        self._last_scale_up = None
+        self._last_scale_down = None
+        # Smoothed arrival rate and response time, used to anticipate load
+        self._arrivals = 0
+        self._rate_mark = time.monotonic()
+        self._rps_ewma: Optional[float] = None
+        self._rt_ewma: Optional[float] = None
+        # Active requests per healthy instance, smoothed over arrivals and completions
+        self._load_ewma = 0.0
+        
+        # Bounds concurrent browser launches/teardowns when replacing instances
+        self._replace_sem = asyncio.Semaphore(self.instance_config.get('max_concurrent_replacements', 4))
+        # Replacements started but not yet healthy, counted toward min_instances
+        self._pending_replacements = 0
         
     async def initialize(self) -> bool:
         """Initialize the coordinator and create initial instances."""
         try:
             logger.info(f"[InstanceCoordinator] Initializing with {self.initial_count} instances...")
             
-            # Create initial instances
-            for i in range(self.initial_count):
-                instance_config = self._create_instance_config(f"initial-{i}")
-                instance_id = await self.browser_manager.create_instance(instance_config)
-                
-                if instance_id:
-                    self.healthy_instances.add(instance_id)
-                    self._initialize_instance_metrics(instance_id)
+            # Launch the initial browsers concurrently
+            configs = [self._create_instance_config(f"initial-{i}") for i in range(self.initial_count)]
+            results = await asyncio.gather(
+                *(self.browser_manager.create_instance(instance_config) for instance_config in configs),
+                return_exceptions=True
+            )
+            
+            for i, (instance_config, instance_id) in enumerate(zip(configs, results)):
+                if isinstance(instance_id, Exception):
+                    logger.error(f"[InstanceCoordinator] Failed to create initial instance {i}: {instance_id}")
+                elif instance_id:
+                    self._register_instance(instance_id, instance_config)
                     logger.info(f"[InstanceCoordinator] Created initial instance: {instance_id}")
                 else:
                     logger.error(f"[InstanceCoordinator] Failed to create initial instance {i}")
@@ -69,6 +182,9 @@ class InstanceCoordinator:
                 return False
             
             logger.info(f"[InstanceCoordinator] Successfully initialized with {len(self.healthy_instances)} instances")
+            self._schedule_warm_refill()
+            if self.auto_scale:
+                self._maintenance_task = asyncio.create_task(self._maintenance_loop())
             return True
             
         except Exception as e:
@@ -77,13 +193,11 @@ class InstanceCoordinator:
     
     def _create_instance_config(self, suffix: str = "") -> dict:
         """Create configuration for a new instance."""
-        config = {
-            **self.instance_defaults,
-            **self.browser_config,
+        return {
+            **self._base_config,
             'suffix': suffix,
             'created_at': datetime.now().isoformat()
         }
-        return config
     
     def _initialize_instance_metrics(self, instance_id: str):
         """Initialize metrics tracking for an instance."""
@@ -93,23 +207,98 @@ class InstanceCoordinator:
             'average_response_time': 0.0,
             'errors': 0,
             'last_request_time': None,
-            'created_at': datetime.now(),
+            'created_at': datetime.now().isoformat(),
             'status': 'healthy'
         }
     
+    @property
+    def healthy_instances_version(self) -> int:
+        """Counter bumped whenever healthy_instances gains or loses a member."""
+        return self.healthy_instances.version
+    
+    def _register_instance(self, instance_id: str, instance_config: dict):
+        """Start tracking a newly created instance."""
+        self.healthy_instances.add(instance_id)
+        self._initialize_instance_metrics(instance_id)
+        self._push_response_time(instance_id, 0.0)
+        self._track_load(instance_id)
+        weight = max(int(instance_config.get('weight', 1)), 1)
+        self._rr_deque.extend([instance_id] * weight)
+        self._invalidate_status_cache()
+    
+    def _invalidate_status_cache(self):
+        """Drop cached status snapshots after a state change."""
+        self._status_cache = None
+        self._instance_list_cache = None
+    
+    def _track_load(self, instance_id: str):
+        """Start tracking an idle instance in the load buckets."""
+        if instance_id in self._load:
+            return
+        self._load[instance_id] = 0
+        self._buckets[0].add(instance_id)
+        self._min_bucket = 0
+    
+    def _untrack_load(self, instance_id: str):
+        """Stop tracking an instance in the load buckets."""
+        load = self._load.pop(instance_id, None)
+        if load is None:
+            return
+        self._buckets[load].discard(instance_id)
+        self._advance_min_bucket()
+    
+    def _adjust_load(self, instance_id: str, delta: int):
+        """Move an instance to the bucket for its new load."""
+        load = self._load.get(instance_id)
+        if load is None:
+            return
+        new_load = max(load + delta, 0)
+        self._buckets[load].discard(instance_id)
+        if new_load == len(self._buckets):
+            self._buckets.append(set())
+        self._buckets[new_load].add(instance_id)
+        self._load[instance_id] = new_load
+        if new_load < self._min_bucket:
+            self._min_bucket = new_load
+        else:
+            self._advance_min_bucket()
+    
+    def _advance_min_bucket(self):
+        """Move the minimum pointer past buckets that have emptied."""
+        buckets = self._buckets
+        while self._min_bucket < len(buckets) - 1 and not buckets[self._min_bucket]:
+            self._min_bucket += 1
+    
+    def _least_loaded_instance(self) -> Optional[str]:
+        """Return the healthy instance with the fewest active requests."""
+        healthy = self.healthy_instances
+        buckets = self._buckets
+        for load in range(self._min_bucket, len(buckets)):
+            for instance_id in buckets[load]:
+                if instance_id in healthy:
+                    return instance_id
+        # Healthy instances that were never tracked count as idle
+        for instance_id in healthy:
+            if instance_id not in self._load:
+                return instance_id
+        return None
+    
     async def create_instance(self, config: dict = None) -> Optional[str]:
         """Create a new browser instance."""
         try:
-            if len(self.browser_manager.instances) >= self.max_instances:
+            if len(self.browser_manager.instances) + self._launching >= self.max_instances:
                 logger.warning("[InstanceCoordinator] Cannot create instance: max instances reached")
                 return None
             
             instance_config = config or self._create_instance_config()
-            instance_id = await self.browser_manager.create_instance(instance_config)
+            self._launching += 1
+            try:
+                instance_id = await self.browser_manager.create_instance(instance_config)
+            finally:
+                self._launching -= 1
             
             if instance_id:
-                self.healthy_instances.add(instance_id)
-                self._initialize_instance_metrics(instance_id)
+                self._register_instance(instance_id, instance_config)
                 logger.info(f"[InstanceCoordinator] Created new instance: {instance_id}")
                 return instance_id
             
@@ -126,12 +315,37 @@ class InstanceCoordinator:
                 logger.warning(f"[InstanceCoordinator] Cannot remove instance {instance_id}: min instances limit")
                 return False
             
-            success = await self.browser_manager.remove_instance(instance_id)
+            # Take the instance out of routing before the teardown yields, so
+            # dispatches and concurrent removals during the await don't see it
+            was_healthy = instance_id in self.healthy_instances
+            was_warm = instance_id in self.warm_instances
+            self.healthy_instances.discard(instance_id)
+            if was_warm:
+                self.warm_instances.remove(instance_id)
+            
+            success = False
+            try:
+                success = await self.browser_manager.remove_instance(instance_id)
+            finally:
+                if not success:
+                    if was_healthy:
+                        self.healthy_instances.add(instance_id)
+                    if was_warm:
+                        self.warm_instances.append(instance_id)
             
             if success:
+                # A health check finishing during the await may have re-added it
                 self.healthy_instances.discard(instance_id)
                 self.unhealthy_instances.discard(instance_id)
+                if instance_id in self.warm_instances:
+                    self.warm_instances.remove(instance_id)
                 self.instance_metrics.pop(instance_id, None)
+                self._untrack_load(instance_id)
+                if instance_id in self._rr_deque:
+                    self._rr_deque = deque(i for i in self._rr_deque if i != instance_id)
+                if was_warm:
+                    self._schedule_warm_refill()
+                self._invalidate_status_cache()
                 logger.info(f"[InstanceCoordinator] Removed instance: {instance_id}")
                 return True
             
@@ -148,15 +362,9 @@ class InstanceCoordinator:
                 logger.warning("[InstanceCoordinator] No healthy instances available")
                 return None
             
-            if strategy == 'round_robin':
-                return self._round_robin_selection()
-            elif strategy == 'least_busy':
-                return self._least_busy_selection()
-            elif strategy == 'response_time':
-                return self._fastest_response_selection()
-            else:
-                # Default to least busy
-                return self._least_busy_selection()
+            # Unknown strategies default to least busy
+            selector = self._selectors.get(strategy, self._least_busy_selection)
+            return selector()
                 
         except Exception as e:
             logger.error(f"[InstanceCoordinator] Error selecting instance: {e}")
@@ -164,71 +372,70 @@ class InstanceCoordinator:
     
     def _round_robin_selection(self) -> Optional[str]:
         """Select instance using round-robin strategy."""
-        if not hasattr(self, '_round_robin_index'):
-            self._round_robin_index = 0
-        
-        healthy_list = list(self.healthy_instances)
-        if not healthy_list:
-            return None
-        
-        instance_id = healthy_list[self._round_robin_index % len(healthy_list)]
-        self._round_robin_index += 1
-        return instance_id
+        rr = self._rr_deque
+        healthy = self.healthy_instances
+        for _ in range(len(rr)):
+            instance_id = rr[0]
+            rr.rotate(-1)
+            if instance_id in healthy:
+                return instance_id
+        # Healthy instances that were never registered here
+        return next(iter(healthy), None)
     
     def _least_busy_selection(self) -> Optional[str]:
         """Select the least busy instance."""
         if not self.healthy_instances:
             return None
         
-        # Count active requests per instance
-        instance_loads = {}
-        for instance_id in self.healthy_instances:
-            active_count = sum(1 for req in self.active_requests.values() 
-                             if req.get('instance_id') == instance_id)
-            instance_loads[instance_id] = active_count
-        
-        # Return instance with minimum load
-        return min(instance_loads.items(), key=lambda x: x[1])[0]
+        return self._least_loaded_instance()
     
     def _fastest_response_selection(self) -> Optional[str]:
         """Select instance with best average response time."""
         if not self.healthy_instances:
             return None
         
+        heap = self._rt_heap
+        skipped = []
         best_instance = None
-        best_time = float('inf')
-        
-        for instance_id in self.healthy_instances:
-            metrics = self.instance_metrics.get(instance_id, {})
-            avg_time = metrics.get('average_response_time', float('inf'))
-            
-            if avg_time < best_time:
-                best_time = avg_time
+        while heap:
+            avg_time, instance_id = heap[0]
+            metrics = self.instance_metrics.get(instance_id)
+            if metrics is None or metrics['average_response_time'] != avg_time:
+                # Removed instance or superseded by a newer entry
+                heapq.heappop(heap)
+            elif instance_id not in self.healthy_instances:
+                # Still current; set aside so it's back in place if the instance recovers
+                skipped.append(heapq.heappop(heap))
+            else:
                 best_instance = instance_id
+                break
+        for entry in skipped:
+            heapq.heappush(heap, entry)
         
-        return best_instance or list(self.healthy_instances)[0]
+        return best_instance or next(iter(self.healthy_instances))
+    
+    def _push_response_time(self, instance_id: str, avg_time: float):
+        """Record an instance's current average in the response-time heap."""
+        heap = self._rt_heap
+        heapq.heappush(heap, (avg_time, instance_id))
+        # Stale entries below the top are never popped, so compact occasionally
+        if len(heap) > 4 * len(self.instance_metrics) + 16:
+            self._rt_heap = [
+                (metrics['average_response_time'], iid)
+                for iid, metrics in self.instance_metrics.items()
+            ]
+            heapq.heapify(self._rt_heap)
     
     async def handle_request(self, request_id: str, payload: dict) -> Optional[str]:
         """Handle an incoming request by assigning it to an instance."""
         try:
-            # Get load balancing strategy from config
-            strategy = self.instance_config.get('load_balancing', 'least_busy')
-            instance_id = await self.get_best_instance(strategy)
+            instance_id = await self.get_best_instance(self.load_balancing)
             
             if not instance_id:
                 logger.error(f"[InstanceCoordinator] No available instance for request {request_id}")
                 return None
             
-            # Track the request
-            self.active_requests[request_id] = {
-                'instance_id': instance_id,
-                'start_time': time.time(),
-                'payload': payload
-            }
-            
-            # Update instance metrics
-            metrics = self.instance_metrics.get(instance_id, {})
-            metrics['last_request_time'] = datetime.now()
+            self.track_request(request_id, instance_id, payload)
             
             logger.debug(f"[InstanceCoordinator] Assigned request {request_id} to instance {instance_id}")
             return instance_id
@@ -237,42 +444,63 @@ class InstanceCoordinator:
             logger.error(f"[InstanceCoordinator] Error handling request {request_id}: {e}")
             return None
     
+    def track_request(self, request_id: str, instance_id: str, payload: dict = None):
+        """Record a request dispatched to an instance, by this coordinator or the load balancer."""
+        self.active_requests[request_id] = {
+            'instance_id': instance_id,
+            'start_time': time.monotonic(),
+            'payload': payload
+        }
+        self._adjust_load(instance_id, 1)
+        self._arrivals += 1
+        self._update_load_ewma()
+        
+        # Update instance metrics; the instance may have been removed meanwhile
+        metrics = self.instance_metrics.get(instance_id)
+        if metrics is not None:
+            metrics['last_request_time'] = time.time()
+        self._invalidate_status_cache()
+    
     async def complete_request(self, request_id: str, success: bool = True):
         """Mark a request as completed and update metrics."""
         try:
-            if request_id not in self.active_requests:
+            request_info = self.active_requests.pop(request_id, None)
+            if request_info is None:
                 return
             
-            request_info = self.active_requests.pop(request_id)
             instance_id = request_info['instance_id']
-            response_time = time.time() - request_info['start_time']
+            now = time.monotonic()
+            response_time = now - request_info['start_time']
+            if self._rt_ewma is None:
+                self._rt_ewma = response_time
+            else:
+                self._rt_ewma += _RATE_EWMA_ALPHA * (response_time - self._rt_ewma)
+            self._adjust_load(instance_id, -1)
+            self._update_load_ewma()
+            self._invalidate_status_cache()
             
             # Update instance metrics
-            if instance_id in self.instance_metrics:
-                metrics = self.instance_metrics[instance_id]
+            # The instance may have been removed while the request was in flight
+            metrics = self.instance_metrics.get(instance_id)
+            if metrics is not None:
                 metrics['requests_handled'] += 1
                 metrics['total_response_time'] += response_time
                 metrics['average_response_time'] = (
                     metrics['total_response_time'] / metrics['requests_handled']
                 )
+                self._push_response_time(instance_id, metrics['average_response_time'])
                 
                 if not success:
                     metrics['errors'] += 1
             
             # Add to request history for scaling decisions
-            self.request_history.append({
-                'timestamp': datetime.now(),
-                'response_time': response_time,
-                'success': success,
-                'instance_id': instance_id
-            })
+            history = self.request_history
+            history.append((now, response_time, success, instance_id))
             
             # Keep only recent history (last hour)
-            cutoff_time = datetime.now().timestamp() - 3600
-            self.request_history = [
-                req for req in self.request_history 
-                if req['timestamp'].timestamp() > cutoff_time
-            ]
+            cutoff_time = now - 3600
+            while history[0][0] <= cutoff_time:
+                history.popleft()
             
             logger.debug(f"[InstanceCoordinator] Completed request {request_id} in {response_time:.2f}s")
             
@@ -282,33 +510,40 @@ class InstanceCoordinator:
     async def health_check_all_instances(self):
         """Perform health checks on all instances."""
         try:
-            all_instances = set(self.browser_manager.instances.keys())
+            instances = list(self.browser_manager.instances.items())
             newly_healthy = set()
             newly_unhealthy = set()
             
-            for instance_id in all_instances:
-                instance = self.browser_manager.get_instance(instance_id)
-                if instance:
-                    is_healthy = await instance.health_check()
+            # Check every instance concurrently; a raised error counts as unhealthy
+            results = await asyncio.gather(
+                *(instance.health_check() for _, instance in instances),
+                return_exceptions=True
+            )
+            
+            for (instance_id, _), result in zip(instances, results):
+                is_healthy = not isinstance(result, BaseException) and bool(result)
+                
+                if is_healthy and instance_id in self.warm_instances:
+                    # Warm instances only start taking traffic once promoted
+                    continue
+                elif is_healthy:
+                    if instance_id in self.unhealthy_instances:
+                        newly_healthy.add(instance_id)
+                    self.healthy_instances.add(instance_id)
+                    self.unhealthy_instances.discard(instance_id)
                     
-                    if is_healthy:
-                        if instance_id in self.unhealthy_instances:
-                            newly_healthy.add(instance_id)
-                        self.healthy_instances.add(instance_id)
-                        self.unhealthy_instances.discard(instance_id)
-                        
-                        # Update metrics
-                        if instance_id in self.instance_metrics:
-                            self.instance_metrics[instance_id]['status'] = 'healthy'
-                    else:
-                        if instance_id in self.healthy_instances:
-                            newly_unhealthy.add(instance_id)
-                        self.unhealthy_instances.add(instance_id)
-                        self.healthy_instances.discard(instance_id)
-                        
-                        # Update metrics
-                        if instance_id in self.instance_metrics:
-                            self.instance_metrics[instance_id]['status'] = 'unhealthy'
+                    # Update metrics
+                    if instance_id in self.instance_metrics:
+                        self.instance_metrics[instance_id]['status'] = 'healthy'
+                else:
+                    if instance_id in self.healthy_instances:
+                        newly_unhealthy.add(instance_id)
+                    self.unhealthy_instances.add(instance_id)
+                    self.healthy_instances.discard(instance_id)
+                    
+                    # Update metrics
+                    if instance_id in self.instance_metrics:
+                        self.instance_metrics[instance_id]['status'] = 'unhealthy'
             
             # Log status changes
             for instance_id in newly_healthy:
@@ -325,7 +560,13 @@ class InstanceCoordinator:
     
     async def _handle_unhealthy_instances(self):
         """Handle unhealthy instances by replacing them."""
-        for instance_id in list(self.unhealthy_instances):
+        unhealthy = list(self.unhealthy_instances)
+        if unhealthy:
+            await asyncio.gather(*(self._replace_instance(instance_id) for instance_id in unhealthy))
+    
+    async def _replace_instance(self, instance_id: str):
+        """Remove an unhealthy instance and create a replacement if needed."""
+        async with self._replace_sem:
             try:
                 logger.info(f"[InstanceCoordinator] Replacing unhealthy instance {instance_id}")
                 
@@ -333,8 +574,12 @@ class InstanceCoordinator:
                 await self.remove_instance(instance_id)
                 
                 # Create a replacement if we're below minimum
-                if len(self.healthy_instances) < self.min_instances:
-                    replacement_id = await self.create_instance()
+                if len(self.healthy_instances) + self._pending_replacements < self.min_instances:
+                    self._pending_replacements += 1
+                    try:
+                        replacement_id = await self.create_instance()
+                    finally:
+                        self._pending_replacements -= 1
                     if replacement_id:
                         logger.info(f"[InstanceCoordinator] Created replacement instance {replacement_id}")
                     else:
@@ -343,78 +588,171 @@ class InstanceCoordinator:
             except Exception as e:
                 logger.error(f"[InstanceCoordinator] Error handling unhealthy instance {instance_id}: {e}")
     
+    async def _maintenance_loop(self):
+        """Run scaling checks on a fixed monotonic schedule."""
+        try:
+            next_run = time.monotonic()
+            while True:
+                # Fixed-rate schedule; a slow check skips ahead rather than bunching up
+                next_run = max(next_run + self.scale_check_interval, time.monotonic())
+                await asyncio.sleep(next_run - time.monotonic())
+                await self.scale_instances()
+                
+        except asyncio.CancelledError:
+            logger.info("[InstanceCoordinator] Maintenance loop cancelled")
+    
     async def scale_instances(self):
         """Auto-scale instances based on load and performance."""
         try:
             if not self.auto_scale:
                 return
             
-            # Check cooldown period
-            if (self.last_scale_action and 
-                time.time() - self.last_scale_action < self.scale_cooldown):
-                return
-            
-            current_load = self._calculate_current_load()
-            should_scale_up = current_load > self.scale_up_threshold
-            should_scale_down = current_load < self.scale_down_threshold
-            
+            now = time.monotonic()
             current_count = len(self.healthy_instances)
             
+            # Advance both averages on every tick so they decay once traffic stops;
+            # a single burst of active requests alone doesn't trigger scaling
+            self._update_load_ewma()
+            demand = self._predicted_demand(now)
+            predicted_load = demand / current_count if current_count else 1.0
+            load = max(self._calculate_current_load(), predicted_load)
+            should_scale_up = load > self.scale_up_threshold
+            should_scale_down = load < self.scale_down_threshold
+            
             if should_scale_up and current_count < self.max_instances:
-                await self._scale_up()
+                if self._cooled_down(self._last_scale_up, self.scale_up_cooldown, now):
+                    # Size the step to the overload instead of one instance per cooldown
+                    needed = current_count + 1
+                    if self.scale_up_threshold > 0:
+                        needed = max(needed, math.ceil(demand / self.scale_up_threshold))
+                    await self._scale_up(min(needed, self.max_instances) - current_count)
             elif should_scale_down and current_count > self.min_instances:
-                await self._scale_down()
+                # Measured from either direction so a fresh scale-up isn't undone at once
+                last_action = max(
+                    (t for t in (self._last_scale_up, self._last_scale_down) if t is not None),
+                    default=None
+                )
+                if self._cooled_down(last_action, self.scale_down_cooldown, now):
+                    await self._scale_down()
                 
         except Exception as e:
             logger.error(f"[InstanceCoordinator] Error during scaling: {e}")
     
+    def _predicted_demand(self, now: float) -> float:
+        """Estimate concurrent requests from the smoothed arrival rate (Little's law)."""
+        elapsed = now - self._rate_mark
+        if elapsed > 0:
+            rps = self._arrivals / elapsed
+            if self._rps_ewma is None:
+                self._rps_ewma = rps
+            else:
+                self._rps_ewma += _RATE_EWMA_ALPHA * (rps - self._rps_ewma)
+            self._arrivals = 0
+            self._rate_mark = now
+        if self._rps_ewma is None or self._rt_ewma is None:
+            return 0.0
+        return self._rps_ewma * self._rt_ewma
+    
+    @staticmethod
+    def _cooled_down(last_action: Optional[float], cooldown: float, now: float) -> bool:
+        """Return True if a cooldown started at last_action has elapsed."""
+        return last_action is None or now - last_action >= cooldown
+    
     def _calculate_current_load(self) -> float:
         """Calculate current system load (0.0 to 1.0)."""
         if not self.healthy_instances:
             return 1.0  # Max load if no healthy instances
         
-        # Calculate based on active requests vs available instances
-        active_count = len(self.active_requests)
-        available_count = len(self.healthy_instances)
-        
-        return min(active_count / available_count, 1.0)
+        return min(max(self._load_ewma, 0.0), 1.0)
     
-    async def _scale_up(self):
-        """Scale up by adding an instance."""
+    def _update_load_ewma(self):
+        """Fold the instantaneous load into the smoothed load."""
+        if self.healthy_instances:
+            current = len(self.active_requests) / len(self.healthy_instances)
+            self._load_ewma += _LOAD_EWMA_ALPHA * (current - self._load_ewma)
+    
+    async def _scale_up(self, count: int = 1):
+        """Scale up by adding count instances."""
         try:
-            logger.info("[InstanceCoordinator] Scaling up: adding instance")
-            instance_id = await self.create_instance()
-            
-            if instance_id:
+            logger.info(f"[InstanceCoordinator] Scaling up: adding {count} instance(s)")
+            added = []
+            while len(added) < count:
+                instance_id = self._promote_warm_instance(refill=False)
+                if not instance_id:
+                    break
+                added.append(instance_id)
+            
+            # Launch whatever the warm pool couldn't cover concurrently
+            if len(added) < count:
+                results = await asyncio.gather(*(self.create_instance() for _ in range(count - len(added))))
+                added.extend(instance_id for instance_id in results if instance_id)
+            # Serving capacity takes the free slots before the warm pool does
+            self._schedule_warm_refill()
+            
+            if added:
                 self.last_scale_action = time.time()
-                logger.info(f"[InstanceCoordinator] Successfully scaled up: added {instance_id}")
+                self._last_scale_up = time.monotonic()
+                logger.info(f"[InstanceCoordinator] Successfully scaled up: added {', '.join(added)}")
             else:
                 logger.error("[InstanceCoordinator] Failed to scale up: could not create instance")
                 
         except Exception as e:
             logger.error(f"[InstanceCoordinator] Error during scale up: {e}")
     
+    def _promote_warm_instance(self, refill: bool = True) -> Optional[str]:
+        """Move a warm instance into rotation, returning its id."""
+        while self.warm_instances:
+            instance_id = self.warm_instances.popleft()
+            if instance_id in self.browser_manager.instances:
+                self._register_instance(instance_id, self.browser_manager.instance_configs.get(instance_id, {}))
+                logger.info(f"[InstanceCoordinator] Promoted warm instance {instance_id}")
+                if refill:
+                    self._schedule_warm_refill()
+                return instance_id
+        return None
+    
+    def _schedule_warm_refill(self):
+        """Top up the warm pool in the background if it is short."""
+        if self.warm_pool_size <= 0 or len(self.warm_instances) >= self.warm_pool_size:
+            return
+        if self._warm_task and not self._warm_task.done():
+            return
+        self._warm_task = asyncio.create_task(self._refill_warm_pool())
+    
+    async def _refill_warm_pool(self):
+        """Launch instances until the warm pool is full or max instances is reached."""
+        try:
+            while (len(self.warm_instances) < self.warm_pool_size and
+                   len(self.browser_manager.instances) + self._launching < self.max_instances):
+                self._launching += 1
+                try:
+                    instance_id = await self.browser_manager.create_instance(self._create_instance_config("warm"))
+                finally:
+                    self._launching -= 1
+                if not instance_id:
+                    logger.error("[InstanceCoordinator] Failed to create warm instance")
+                    return
+                self.warm_instances.append(instance_id)
+                logger.info(f"[InstanceCoordinator] Warm instance ready: {instance_id}")
+                
+        except Exception as e:
+            logger.error(f"[InstanceCoordinator] Error refilling warm pool: {e}")
+    
     async def _scale_down(self):
         """Scale down by removing an instance."""
         try:
             if len(self.healthy_instances) <= self.min_instances:
                 return
             
-            # Find the least busy instance to remove
-            instance_loads = {}
-            for instance_id in self.healthy_instances:
-                active_count = sum(1 for req in self.active_requests.values()
-                                 if req.get('instance_id') == instance_id)
-                instance_loads[instance_id] = active_count
-            
-            # Remove instance with minimum load
-            instance_to_remove = min(instance_loads.items(), key=lambda x: x[1])[0]
+            # Remove the least busy instance
+            instance_to_remove = self._least_loaded_instance()
             
             logger.info(f"[InstanceCoordinator] Scaling down: removing instance {instance_to_remove}")
             success = await self.remove_instance(instance_to_remove)
             
             if success:
                 self.last_scale_action = time.time()
+                self._last_scale_down = time.monotonic()
                 logger.info(f"[InstanceCoordinator] Successfully scaled down: removed {instance_to_remove}")
             else:
                 logger.error(f"[InstanceCoordinator] Failed to scale down: could not remove {instance_to_remove}")
@@ -426,11 +764,21 @@ class InstanceCoordinator:
         """Cleanup all instances and resources."""
         try:
             logger.info("[InstanceCoordinator] Cleaning up all instances...")
+            for task in (self._maintenance_task, self._warm_task):
+                if task and not task.done():
+                    task.cancel()
             await self.browser_manager.cleanup_all()
+            self.warm_instances.clear()
             self.healthy_instances.clear()
             self.unhealthy_instances.clear()
             self.instance_metrics.clear()
             self.active_requests.clear()
+            self._load.clear()
+            self._buckets = [set()]
+            self._min_bucket = 0
+            self._rr_deque.clear()
+            self._rt_heap.clear()
+            self._invalidate_status_cache()
             logger.info("[InstanceCoordinator] Cleanup completed")
             
         except Exception as e:
@@ -438,10 +786,15 @@ class InstanceCoordinator:
     
     def get_status(self) -> Dict[str, Any]:
         """Get current coordinator status."""
-        return {
+        now = time.monotonic()
+        if self._status_cache and now - self._status_cache[0] < _STATUS_CACHE_TTL:
+            return self._status_cache[1]
+        
+        status = {
             'total_instances': len(self.browser_manager.instances),
             'healthy_instances': len(self.healthy_instances),
             'unhealthy_instances': len(self.unhealthy_instances),
+            'warm_instances': len(self.warm_instances),
             'active_requests': len(self.active_requests),
             'current_load': self._calculate_current_load(),
             'min_instances': self.min_instances,
@@ -450,9 +803,15 @@ class InstanceCoordinator:
             'last_scale_action': self.last_scale_action,
             'instance_metrics': self.instance_metrics
         }
+        self._status_cache = (now, status)
+        return status
     
     def get_instance_list(self) -> List[Dict[str, Any]]:
         """Get detailed list of all instances."""
+        now = time.monotonic()
+        if self._instance_list_cache and now - self._instance_list_cache[0] < _STATUS_CACHE_TTL:
+            return self._instance_list_cache[1]
+        
         instances = []
         
         for instance_id, instance in self.browser_manager.get_all_instances().items():
@@ -465,4 +824,5 @@ class InstanceCoordinator:
                 'is_healthy': instance_id in self.healthy_instances
             })
         
+        self._instance_list_cache = (now, instances)
         return instances
\ No newline at end of file
@@ -9,11 +9,33 @@ import asyncio
 import logging
 import time
 import random
-from typing import Dict, List, Optional, Any, Callable
+from collections import deque
+from itertools import accumulate, cycle
+from typing import Dict, List, NamedTuple, Optional, Any, Callable
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Weight of the newest sample in each instance's average response time
+_RESPONSE_TIME_ALPHA = 0.1
+
+
+class _ActiveRequest(NamedTuple):
+    """A routed request that has not completed yet."""
+    start_time: float
+    payload_size: int
+    routed_at: float
+
+
+class _HistoryEntry(NamedTuple):
+    """A completed request kept in the routing history."""
+    request_id: str
+    instance_id: str
+    response_time: float
+    success: bool
+    payload_size: int
+    completed_at: float
+
 
 class LoadBalancer:
     """Handles request routing and load balancing across browser instances."""
@@ -27,6 +49,8 @@ class LoadBalancer:
         self.strategy = self.instance_config.get('load_balancing', 'least_busy')
         self.max_retries = self.instance_config.get('max_retries', 3)
         self.retry_delay = 1.0  # seconds
+        self.max_retry_delay = self.instance_config.get('max_retry_delay', 10.0)
+        self.circuit_cooldown = self.instance_config.get('circuit_breaker_cooldown', 30.0)
         
         # Strategy implementations
         self.strategies = {
@@ -34,18 +58,29 @@ class LoadBalancer:
             'least_busy': self._least_busy_strategy,
             'response_time': self._response_time_strategy,
             'random': self._random_strategy,
-            'weighted_round_robin': self._weighted_round_robin_strategy
+            'weighted_round_robin': self._weighted_round_robin_strategy,
+            'p2c': self._power_of_two_strategy
         }
+        # Routing is hot and strategy changes are rare, so bind the function up front
+        self._strategy_func = self._resolve_strategy(self.strategy)
+        
+        # Tuple snapshot of the coordinator's healthy set and the version it reflects
+        self._healthy_snapshot: tuple = ()
+        self._healthy_snapshot_version = -1
         
-        # Round robin state
-        self._round_robin_index = 0
+        # Round robin state, restarted over each new healthy snapshot
+        self._rr_iter = cycle(())
         
-        # Weighted round robin state
-        self._weighted_counters = {}
+        # Instance id -> time its circuit closes again; open instances are not selected
+        self._circuit: Dict[str, float] = {}
         
         # Request tracking
-        self.active_requests: Dict[str, dict] = {}
-        self.request_history = []
+        # Request id -> instance id; the request details live in that instance's shard
+        self.active_requests: Dict[str, str] = {}
+        # Instance id -> its active requests, kept in step with active_requests
+        self._instance_requests: Dict[str, Dict[str, _ActiveRequest]] = {}
+        # Most recent completions; the deque drops the oldest once full
+        self.request_history: deque = deque(maxlen=1000)
         self.routing_stats = {
             'total_requests': 0,
             'successful_routes': 0,
@@ -56,12 +91,24 @@ class LoadBalancer:
         
         # Performance tracking
         self.instance_performance: Dict[str, dict] = {}
+        # Bumped whenever a value the weighted strategy reads changes
+        self._perf_version = 0
+        # (perf version, healthy snapshot, cumulative weights)
+        self._wrr_cache: Optional[tuple] = None
         
     async def route_request(self, request_id: str, payload: dict, 
-                          strategy_override: str = None) -> Optional[str]:
-        """Route a request to the best available instance."""
+                          strategy_override: str = None, payload_size: int = None) -> Optional[str]:
+        """Route a request to the best available instance.
+        
+        payload_size should be the raw body length when the caller has it;
+        otherwise it is estimated from the message contents.
+        """
         try:
             strategy = strategy_override or self.strategy
+            strategy_func = (
+                self._resolve_strategy(strategy_override) if strategy_override
+                else self._strategy_func
+            )
             self.routing_stats['total_requests'] += 1
             self.routing_stats['strategy_usage'][strategy] = (
                 self.routing_stats['strategy_usage'].get(strategy, 0) + 1
@@ -69,30 +116,33 @@ class LoadBalancer:
             
             # Try to route the request with retries
             for attempt in range(self.max_retries + 1):
-                instance_id = await self._select_instance(strategy)
+                instance_id = strategy_func()
                 
                 if not instance_id:
                     logger.warning(f"[LoadBalancer] No available instance for request {request_id}")
                     if attempt < self.max_retries:
-                        await asyncio.sleep(self.retry_delay * (attempt + 1))
+                        # Capacity may take a while to return, so back off exponentially
+                        await asyncio.sleep(self._retry_delay(self.retry_delay * (2 ** attempt)))
                         continue
                     break
                 
                 # Validate instance is still healthy
-                if not await self._validate_instance(instance_id):
+                if not self._validate_instance(instance_id):
                     logger.warning(f"[LoadBalancer] Instance {instance_id} failed validation")
+                    self._open_circuit(instance_id)
                     if attempt < self.max_retries:
                         self.routing_stats['retries'] += 1
-                        await asyncio.sleep(self.retry_delay)
+                        # A single busy instance clears quickly; keep this wait flat
+                        await asyncio.sleep(self._retry_delay(self.retry_delay))
                         continue
                     break
                 
                 # Successfully routed
-                await self._track_request(request_id, instance_id, payload)
+                self._track_request(request_id, instance_id, payload, payload_size)
                 self.routing_stats['successful_routes'] += 1
                 
-                logger.debug(f"[LoadBalancer] Routed request {request_id} to instance {instance_id} "
-                           f"(strategy: {strategy}, attempt: {attempt + 1})")
+                logger.debug("[LoadBalancer] Routed request %s to instance %s "
+                             "(strategy: %s, attempt: %d)", request_id, instance_id, strategy, attempt + 1)
                 return instance_id
             
             # All attempts failed
@@ -105,53 +155,90 @@ class LoadBalancer:
             self.routing_stats['failed_routes'] += 1
             return None
     
-    async def _select_instance(self, strategy: str) -> Optional[str]:
-        """Select an instance using the specified strategy."""
-        try:
-            if strategy not in self.strategies:
-                logger.warning(f"[LoadBalancer] Unknown strategy '{strategy}', using 'least_busy'")
-                strategy = 'least_busy'
-            
-            strategy_func = self.strategies[strategy]
-            return await strategy_func()
-            
-        except Exception as e:
-            logger.error(f"[LoadBalancer] Error in strategy '{strategy}': {e}")
-            # Fallback to least busy
-            return await self._least_busy_strategy()
+    def _retry_delay(self, delay: float) -> float:
+        """Cap a retry delay and add +/-20% jitter so concurrent retries spread out."""
+        return min(delay, self.max_retry_delay) * random.uniform(0.8, 1.2)
+    
+    def _resolve_strategy(self, strategy: str) -> Callable[[], Optional[str]]:
+        """Look up a strategy function, falling back to least busy for unknown names."""
+        strategy_func = self.strategies.get(strategy)
+        if strategy_func is None:
+            logger.warning(f"[LoadBalancer] Unknown strategy '{strategy}', using 'least_busy'")
+            return self._least_busy_strategy
+        return strategy_func
     
-    async def _round_robin_strategy(self) -> Optional[str]:
+    def _get_healthy(self) -> tuple:
+        """Return a snapshot of the healthy instances, rebuilt only when membership changes."""
+        version = self.coordinator.healthy_instances_version
+        if version != self._healthy_snapshot_version:
+            self._healthy_snapshot = tuple(self.coordinator.healthy_instances)
+            self._healthy_snapshot_version = version
+            self._rr_iter = cycle(self._healthy_snapshot)
+        return self._healthy_snapshot
+    
+    def _open_circuit(self, instance_id: str):
+        """Keep an instance out of selection until its cool-down has passed."""
+        self._circuit[instance_id] = time.time() + self.circuit_cooldown
+    
+    def _get_candidates(self) -> tuple:
+        """Return the healthy instances whose circuit is closed.
+        
+        Expired entries are dropped here, giving the instance one trial request;
+        a failed validation opens its circuit again.
+        """
+        healthy_instances = self._get_healthy()
+        circuit = self._circuit
+        if not circuit:
+            return healthy_instances
+        
+        now = time.time()
+        for instance_id in [i for i, until in circuit.items() if until <= now]:
+            del circuit[instance_id]
+        if not circuit:
+            return healthy_instances
+        return tuple(i for i in healthy_instances if i not in circuit)
+    
+    def _round_robin_strategy(self) -> Optional[str]:
         """Round robin load balancing strategy."""
-        healthy_instances = list(self.coordinator.healthy_instances)
+        healthy_instances = self._get_candidates()
         
         if not healthy_instances:
             return None
         
-        instance_id = healthy_instances[self._round_robin_index % len(healthy_instances)]
-        self._round_robin_index += 1
-        
+        # The cycle runs over the full healthy snapshot; skip instances with an open circuit
+        circuit = self._circuit
+        instance_id = next(self._rr_iter)
+        while instance_id in circuit:
+            instance_id = next(self._rr_iter)
         return instance_id
     
-    async def _least_busy_strategy(self) -> Optional[str]:
+    def _least_busy_strategy(self) -> Optional[str]:
         """Least busy load balancing strategy."""
-        healthy_instances = list(self.coordinator.healthy_instances)
+        healthy_instances = self._get_candidates()
         
         if not healthy_instances:
             return None
         
-        # Count active requests per instance
-        instance_loads = {}
-        for instance_id in healthy_instances:
-            active_count = sum(1 for req in self.active_requests.values() 
-                             if req.get('instance_id') == instance_id)
-            instance_loads[instance_id] = active_count
-        
         # Return instance with minimum load
-        return min(instance_loads.items(), key=lambda x: x[1])[0]
+        instance_requests = self._instance_requests
+        return min(healthy_instances, key=lambda i: len(instance_requests.get(i, ())))
+    
+    def _power_of_two_strategy(self) -> Optional[str]:
+        """Power-of-two-choices: the less busy of two randomly sampled instances."""
+        healthy_instances = self._get_candidates()
+        
+        if not healthy_instances:
+            return None
+        if len(healthy_instances) == 1:
+            return healthy_instances[0]
+        
+        a, b = random.sample(healthy_instances, 2)
+        instance_requests = self._instance_requests
+        return a if len(instance_requests.get(a, ())) <= len(instance_requests.get(b, ())) else b
     
-    async def _response_time_strategy(self) -> Optional[str]:
+    def _response_time_strategy(self) -> Optional[str]:
         """Response time based load balancing strategy."""
-        healthy_instances = list(self.coordinator.healthy_instances)
+        healthy_instances = self._get_candidates()
         
         if not healthy_instances:
             return None
@@ -170,167 +257,174 @@ class LoadBalancer:
         
         return best_instance or healthy_instances[0]
     
-    async def _random_strategy(self) -> Optional[str]:
+    def _random_strategy(self) -> Optional[str]:
         """Random load balancing strategy."""
-        healthy_instances = list(self.coordinator.healthy_instances)
+        healthy_instances = self._get_candidates()
         
         if not healthy_instances:
             return None
         
         return random.choice(healthy_instances)
     
-    async def _weighted_round_robin_strategy(self) -> Optional[str]:
+    def _weighted_round_robin_strategy(self) -> Optional[str]:
         """Weighted round robin based on instance performance."""
-        healthy_instances = list(self.coordinator.healthy_instances)
+        healthy_instances = self._get_candidates()
         
         if not healthy_instances:
             return None
         
-        # Calculate weights based on performance (inverse of response time)
-        weights = {}
-        for instance_id in healthy_instances:
-            perf = self.instance_performance.get(instance_id, {})
-            avg_time = perf.get('avg_response_time', 1.0)
-            # Higher weight for faster instances
-            weights[instance_id] = 1.0 / max(avg_time, 0.1)
-        
-        # Weighted selection
-        total_weight = sum(weights.values())
-        if total_weight == 0:
-            return random.choice(healthy_instances)
-        
-        # Normalize weights
-        for instance_id in weights:
-            weights[instance_id] /= total_weight
-        
-        # Select based on weights
-        rand_val = random.random()
-        cumulative = 0.0
-        
-        for instance_id, weight in weights.items():
-            cumulative += weight
-            if rand_val <= cumulative:
-                return instance_id
+        # Rebuild the cumulative weights only when performance or membership changed
+        cache = self._wrr_cache
+        if cache is None or cache[0] != self._perf_version or cache[1] is not healthy_instances:
+            performance = self.instance_performance
+            # Higher weight for faster instances (inverse of response time)
+            cumulative = list(accumulate(
+                1.0 / max(performance.get(instance_id, {}).get('avg_response_time', 1.0), 0.1)
+                for instance_id in healthy_instances
+            ))
+            cache = self._wrr_cache = (self._perf_version, healthy_instances, cumulative)
         
-        return healthy_instances[-1]  # Fallback
+        return random.choices(healthy_instances, cum_weights=cache[2])[0]
     
-    async def _validate_instance(self, instance_id: str) -> bool:
+    def _validate_instance(self, instance_id: str) -> bool:
         """Validate that an instance is healthy and available."""
-        try:
-            # Check if instance is in healthy set
-            if instance_id not in self.coordinator.healthy_instances:
-                return False
-            
-            # Get the actual instance
-            instance = self.coordinator.browser_manager.get_instance(instance_id)
-            if not instance:
-                return False
-            
-            # Check instance status
-            if instance.status != 'ready':
-                return False
-            
-            # Quick health check (optional, might be too slow)
-            # return await instance.health_check()
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"[LoadBalancer] Error validating instance {instance_id}: {e}")
+        # Check if instance is in healthy set
+        if instance_id not in self.coordinator.healthy_instances:
             return False
+        
+        # Get the actual instance
+        instance = self.coordinator.browser_manager.get_instance(instance_id)
+        if not instance:
+            return False
+        
+        # No live instance.health_check() here: it's too slow for routing, and the
+        # health monitor keeps healthy_instances current
+        return instance.status == 'ready'
     
-    async def _track_request(self, request_id: str, instance_id: str, payload: dict):
+    @staticmethod
+    def _estimate_payload_size(payload: dict) -> int:
+        """Approximate a chat payload's size from its text message contents."""
+        if not isinstance(payload, dict):
+            return 0
+        return sum(
+            len(message.get('content') or '')
+            for message in payload.get('messages') or ()
+            if isinstance(message, dict) and isinstance(message.get('content'), str)
+        )
+    
+    def _track_request(self, request_id: str, instance_id: str, payload: dict,
+                       payload_size: int = None):
         """Track a routed request."""
-        self.active_requests[request_id] = {
-            'instance_id': instance_id,
-            'start_time': time.time(),
-            'payload_size': len(str(payload)),
-            'routed_at': datetime.now()
-        }
+        if payload_size is None:
+            payload_size = self._estimate_payload_size(payload)
+        now = time.time()
+        self.active_requests[request_id] = instance_id
+        self._instance_requests.setdefault(instance_id, {})[request_id] = _ActiveRequest(
+            now, payload_size, now
+        )
         
         # Initialize performance tracking for new instances
         if instance_id not in self.instance_performance:
             self.instance_performance[instance_id] = {
                 'total_requests': 0,
-                'total_response_time': 0.0,
                 'avg_response_time': 0.0,
                 'success_count': 0,
                 'error_count': 0,
+                'success_rate': 0.0,
                 'last_request_time': None
             }
+            self._perf_version += 1
         
         # Update instance performance
         perf = self.instance_performance[instance_id]
         perf['total_requests'] += 1
-        perf['last_request_time'] = datetime.now()
+        perf['last_request_time'] = now
+        
+        # Keep the coordinator's load figures, which drive autoscaling, in step
+        self.coordinator.track_request(request_id, instance_id, payload)
     
-    async def complete_request(self, request_id: str, success: bool = True, 
-                             response_size: int = 0):
+    async def complete_request(self, request_id: str, success: bool = True):
         """Mark a request as completed and update performance metrics."""
         try:
-            if request_id not in self.active_requests:
+            instance_id = self.active_requests.pop(request_id, None)
+            if instance_id is None:
                 logger.warning(f"[LoadBalancer] Request {request_id} not found in active requests")
                 return
             
-            request_info = self.active_requests.pop(request_id)
-            instance_id = request_info['instance_id']
-            response_time = time.time() - request_info['start_time']
+            instance_requests = self._instance_requests[instance_id]
+            request_info = instance_requests.pop(request_id)
+            if not instance_requests:
+                del self._instance_requests[instance_id]
+            now = time.time()
+            response_time = now - request_info.start_time
+            await self.coordinator.complete_request(request_id, success)
             
             # Update instance performance
             if instance_id in self.instance_performance:
                 perf = self.instance_performance[instance_id]
-                perf['total_response_time'] += response_time
-                perf['avg_response_time'] = (
-                    perf['total_response_time'] / perf['total_requests']
-                )
+                # Moving average so a slow warm-up doesn't weigh on the instance forever;
+                # seeded by the first timed sample, since failures counted in
+                # handle_instance_failure carry no timing
+                if perf['avg_response_time']:
+                    perf['avg_response_time'] += _RESPONSE_TIME_ALPHA * (response_time - perf['avg_response_time'])
+                else:
+                    perf['avg_response_time'] = response_time
+                self._perf_version += 1
                 
                 if success:
                     perf['success_count'] += 1
                 else:
                     perf['error_count'] += 1
+                self._update_success_rate(perf)
             
             # Add to request history
-            self.request_history.append({
-                'request_id': request_id,
-                'instance_id': instance_id,
-                'response_time': response_time,
-                'success': success,
-                'payload_size': request_info['payload_size'],
-                'response_size': response_size,
-                'completed_at': datetime.now()
-            })
-            
-            # Keep only recent history (last 1000 requests)
-            if len(self.request_history) > 1000:
-                self.request_history = self.request_history[-1000:]
+            self.request_history.append(_HistoryEntry(
+                request_id, instance_id, response_time, success,
+                request_info.payload_size, now
+            ))
             
-            logger.debug(f"[LoadBalancer] Completed request {request_id} "
-                        f"(instance: {instance_id}, time: {response_time:.2f}s, success: {success})")
+            logger.debug("[LoadBalancer] Completed request %s (instance: %s, time: %.2fs, success: %s)",
+                         request_id, instance_id, response_time, success)
             
         except Exception as e:
             logger.error(f"[LoadBalancer] Error completing request {request_id}: {e}")
     
+    @staticmethod
+    def _update_success_rate(perf: dict):
+        """Refresh an instance's success rate over its completed requests."""
+        completed = perf['success_count'] + perf['error_count']
+        perf['success_rate'] = perf['success_count'] / completed if completed else 0.0
+    
     async def handle_instance_failure(self, instance_id: str):
         """Handle failure of an instance by redistributing its requests."""
         try:
-            # Find all active requests for this instance
-            failed_requests = [
-                req_id for req_id, req_info in self.active_requests.items()
-                if req_info.get('instance_id') == instance_id
-            ]
+            # Take all active requests for this instance in one go
+            failed_requests = self._instance_requests.pop(instance_id, {})
             
             if failed_requests:
                 logger.info(f"[LoadBalancer] Redistributing {len(failed_requests)} requests "
                            f"from failed instance {instance_id}")
                 
-                # Mark requests as failed (they will need to be retried by the client)
-                for request_id in failed_requests:
-                    await self.complete_request(request_id, success=False)
+                # Mark requests as failed (they will need to be retried by the client).
+                # Time until the crash says nothing about speed, so the average is left alone.
+                now = time.time()
+                active_requests = self.active_requests
+                history = []
+                for request_id, request_info in failed_requests.items():
+                    del active_requests[request_id]
+                    history.append(_HistoryEntry(
+                        request_id, instance_id, now - request_info.start_time, False,
+                        request_info.payload_size, now
+                    ))
+                    await self.coordinator.complete_request(request_id, False)
+                self.request_history.extend(history)
+                
+                perf = self.instance_performance.get(instance_id)
+                if perf is not None:
+                    perf['error_count'] += len(failed_requests)
+                    self._update_success_rate(perf)
             
-            # Update performance tracking
-            if instance_id in self.instance_performance:
-                perf = self.instance_performance[instance_id]
-                perf['error_count'] += len(failed_requests)
+            self._open_circuit(instance_id)
             
         except Exception as e:
             logger.error(f"[LoadBalancer] Error handling instance failure {instance_id}: {e}")
@@ -339,6 +433,7 @@ class LoadBalancer:
         """Change the load balancing strategy."""
         if strategy in self.strategies:
             self.strategy = strategy
+            self._strategy_func = self.strategies[strategy]
             logger.info(f"[LoadBalancer] Changed strategy to: {strategy}")
         else:
             logger.warning(f"[LoadBalancer] Unknown strategy: {strategy}")
@@ -359,16 +454,26 @@ class LoadBalancer:
     def get_instance_performance(self, instance_id: str = None) -> Dict[str, Any]:
         """Get performance metrics for instances."""
         if instance_id:
-            return self.instance_performance.get(instance_id, {})
-        return self.instance_performance.copy()
+            return self._render_performance(self.instance_performance.get(instance_id, {}))
+        return {
+            instance_id: self._render_performance(perf)
+            for instance_id, perf in self.instance_performance.items()
+        }
+    
+    @staticmethod
+    def _render_performance(perf: dict) -> dict:
+        """Copy a performance entry with its epoch timestamp formatted as ISO."""
+        last_request_time = perf.get('last_request_time')
+        if last_request_time is None:
+            return dict(perf)
+        return {**perf, 'last_request_time': datetime.fromtimestamp(last_request_time).isoformat()}
     
     def get_load_distribution(self) -> Dict[str, Any]:
         """Get current load distribution across instances."""
         distribution = {}
         
         for instance_id in self.coordinator.healthy_instances:
-            active_count = sum(1 for req in self.active_requests.values() 
-                             if req.get('instance_id') == instance_id)
+            active_count = len(self._instance_requests.get(instance_id, ()))
             
             perf = self.instance_performance.get(instance_id, {})
             
@@ -376,9 +481,7 @@ class LoadBalancer:
                 'active_requests': active_count,
                 'total_requests': perf.get('total_requests', 0),
                 'avg_response_time': perf.get('avg_response_time', 0.0),
-                'success_rate': (
-                    perf.get('success_count', 0) / max(perf.get('total_requests', 1), 1)
-                ),
+                'success_rate': perf.get('success_rate', 0.0),
                 'error_count': perf.get('error_count', 0)
             }
         
@@ -394,9 +497,9 @@ class LoadBalancer:
             'strategy_usage': {}
         }
         self.instance_performance.clear()
+        self._perf_version += 1
         self.request_history.clear()
-        self._round_robin_index = 0
-        self._weighted_counters.clear()
+        self._rr_iter = cycle(self._healthy_snapshot)
         
         logger.info("[LoadBalancer] Statistics reset")
     
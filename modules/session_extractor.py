@@ -6,44 +6,86 @@ from LMArena.ai, replacing the Tampermonkey functionality.
 """
 
 import asyncio
+import hashlib
 import json
 import logging
+import os
 import re
+import time
 import uuid
+from collections import deque
 from datetime import datetime
-from typing import Optional, Tuple, Dict, Any, List
-from playwright.async_api import Page, Request, Response
+from typing import TYPE_CHECKING, Optional, Tuple, Dict, Any
+
+# Only needed for annotations; importing playwright at runtime is slow
+if TYPE_CHECKING:
+    from playwright.async_api import Page, Request, Response
 
 logger = logging.getLogger(__name__)
 
+_HEX_DIGITS = frozenset('0123456789abcdefABCDEF')
+
+_LMARENA_URL = 'https://lmarena.ai/'
+
+# LMArena hosts and the API paths that can carry IDs, matched in a single scan
+_RELEVANT_URL = re.compile(r'lmarena\.ai|/api/|/chat|/conversation|/message|/session', re.IGNORECASE)
+
+# Larger response bodies are not fetched; ID-bearing API replies are small JSON envelopes
+_MAX_BODY_BYTES = 65536
+# IDs sit near the start of a JSON envelope, so only this much of a body is decoded and scanned
+_BODY_SCAN_BYTES = 4096
+
+# Assets that never carry IDs; aborting them lets the page settle sooner during extraction
+_BLOCKED_RESOURCE_TYPES = frozenset({
+    'image', 'imageset', 'stylesheet', 'font', 'media', 'texttrack', 'beacon', 'csp_report'
+})
+
+
+def _is_relevant_url(url: str) -> bool:
+    """Check a URL against the relevant patterns in one scan."""
+    return _RELEVANT_URL.search(url) is not None
+
+
+def _id_pattern(name: str) -> re.Pattern:
+    """Build one pattern matching every way LMArena writes a session or message ID."""
+    return re.compile(
+        rf'(?:{name}[_-]?id["\']?\s*[:=]\s*["\']?|"{name}":\s*"|/{name}/|{name}=)([a-f0-9-]{{36}})',
+        re.IGNORECASE
+    )
+
+
+# One alternation per ID type, so each text is scanned once for each
+_EXTRACTION_PATTERNS = {
+    'session_id': _id_pattern('session'),
+    'message_id': _id_pattern('message')
+}
+
 
 class SessionExtractor:
     """Extracts session and message IDs from LMArena interactions."""
     
-    def __init__(self, page: Page, config: dict = None):
+    def __init__(self, page: 'Page', config: dict = None):
         self.page = page
         self.config = config or {}
-        self.intercepted_requests: List[dict] = []
-        self.intercepted_responses: List[dict] = []
+        # Only the most recent entries are ever reported, so older ones are dropped
+        self.intercepted_requests: deque = deque(maxlen=50)
+        self.intercepted_responses: deque = deque(maxlen=50)
         self.session_id: Optional[str] = None
         self.message_id: Optional[str] = None
-        self.extraction_patterns = {
-            'session_id': [
-                r'session[_-]?id["\']?\s*[:=]\s*["\']?([a-f0-9-]{36})["\']?',
-                r'sessionId["\']?\s*[:=]\s*["\']?([a-f0-9-]{36})["\']?',
-                r'"session":\s*"([a-f0-9-]{36})"',
-                r'/session/([a-f0-9-]{36})',
-                r'session=([a-f0-9-]{36})'
-            ],
-            'message_id': [
-                r'message[_-]?id["\']?\s*[:=]\s*["\']?([a-f0-9-]{36})["\']?',
-                r'messageId["\']?\s*[:=]\s*["\']?([a-f0-9-]{36})["\']?',
-                r'"message":\s*"([a-f0-9-]{36})"',
-                r'/message/([a-f0-9-]{36})',
-                r'message=([a-f0-9-]{36})'
-            ]
-        }
+        # Set once both IDs have been captured
+        self._ids_ready = asyncio.Event()
+        self.extraction_patterns = _EXTRACTION_PATTERNS
         self.is_intercepting = False
+        # True only while an extraction drives the page; assets are blocked just then
+        self._extracting = False
+        # Extracted IDs are reused from disk for this long; 0 disables the cache
+        self.cache_ttl = self.config.get('session_cache_ttl', 300)
+        self.cache_dir = self.config.get('session_cache_dir', '.cache')
+        # IDs belong to one browser's session, so each instance keeps its own cache entries;
+        # without an instance_id there is nothing safe to key on and the cache is skipped
+        self.cache_scope = self.config.get('instance_id')
+        # In-flight extractions, shared by callers asking for the same IDs at once
+        self._pending_extractions: Dict[tuple, asyncio.Task] = {}
         
     async def setup_interception(self):
         """Set up request and response interception."""
@@ -67,16 +109,25 @@ class SessionExtractor:
     async def _handle_request(self, route):
         """Handle intercepted requests."""
         try:
+            # Both IDs are in hand; let traffic through without inspecting it
+            if self.session_id and self.message_id:
+                await route.continue_()
+                return
+            
             request = route.request
             
+            if self._extracting and request.resource_type in _BLOCKED_RESOURCE_TYPES:
+                await route.abort()
+                return
+            
             # Log relevant requests
             if self._is_relevant_request(request):
                 request_data = {
                     'url': request.url,
                     'method': request.method,
-                    'headers': dict(request.headers),
+                    'headers': request.headers,
                     'post_data': request.post_data,
-                    'timestamp': datetime.now()
+                    'timestamp': time.time()
                 }
                 
                 self.intercepted_requests.append(request_data)
@@ -93,14 +144,21 @@ class SessionExtractor:
             logger.error(f"[SessionExtractor] Error handling request: {e}")
             await route.continue_()
     
-    async def _handle_response(self, response: Response):
+    async def _handle_response(self, response: 'Response'):
         """Handle intercepted responses."""
         try:
+            if self.session_id and self.message_id:
+                return
+            
             if self._is_relevant_response(response):
-                # Get response body if it's JSON
+                headers = response.headers
+                
+                # Get response body if it's small JSON
                 try:
-                    if 'application/json' in response.headers.get('content-type', ''):
-                        body = await response.text()
+                    if ('application/json' in headers.get('content-type', '')
+                            and int(headers.get('content-length') or 0) <= _MAX_BODY_BYTES):
+                        raw = await response.body()
+                        body = raw[:_BODY_SCAN_BYTES].decode('utf-8', errors='ignore')
                     else:
                         body = None
                 except:
@@ -109,9 +167,9 @@ class SessionExtractor:
                 response_data = {
                     'url': response.url,
                     'status': response.status,
-                    'headers': dict(response.headers),
+                    'headers': headers,
                     'body': body,
-                    'timestamp': datetime.now()
+                    'timestamp': time.time()
                 }
                 
                 self.intercepted_responses.append(response_data)
@@ -124,37 +182,15 @@ class SessionExtractor:
         except Exception as e:
             logger.error(f"[SessionExtractor] Error handling response: {e}")
     
-    def _is_relevant_request(self, request: Request) -> bool:
+    def _is_relevant_request(self, request: 'Request') -> bool:
         """Check if a request is relevant for ID extraction."""
-        url = request.url.lower()
-        
-        # LMArena API endpoints
-        relevant_patterns = [
-            'lmarena.ai',
-            '/api/',
-            '/chat',
-            '/conversation',
-            '/message',
-            '/session'
-        ]
-        
-        return any(pattern in url for pattern in relevant_patterns)
+        return _is_relevant_url(request.url)
     
-    def _is_relevant_response(self, response: Response) -> bool:
+    def _is_relevant_response(self, response: 'Response') -> bool:
         """Check if a response is relevant for ID extraction."""
-        url = response.url.lower()
-        
-        # Same patterns as requests
-        relevant_patterns = [
-            'lmarena.ai',
-            '/api/',
-            '/chat',
-            '/conversation',
-            '/message',
-            '/session'
-        ]
-        
-        return any(pattern in url for pattern in relevant_patterns)
+        # Response IDs only come back from LMArena's API endpoints (e.g. /api/stream/...);
+        # page documents and bundles never carry them
+        return '/api/' in response.url.lower()
     
     async def _extract_ids_from_request(self, request_data: dict):
         """Extract session/message IDs from request data."""
@@ -162,15 +198,10 @@ class SessionExtractor:
             # Extract from URL
             await self._extract_from_text(request_data['url'])
             
-            # Extract from POST data
+            # Extract from POST data; IDs travel in URLs and bodies, never in headers
             if request_data.get('post_data'):
                 await self._extract_from_text(request_data['post_data'])
             
-            # Extract from headers
-            for header_value in request_data.get('headers', {}).values():
-                if isinstance(header_value, str):
-                    await self._extract_from_text(header_value)
-                    
         except Exception as e:
             logger.error(f"[SessionExtractor] Error extracting IDs from request: {e}")
     
@@ -181,66 +212,90 @@ class SessionExtractor:
             if response_data.get('body'):
                 await self._extract_from_text(response_data['body'])
             
-            # Extract from headers
-            for header_value in response_data.get('headers', {}).values():
-                if isinstance(header_value, str):
-                    await self._extract_from_text(header_value)
-                    
         except Exception as e:
             logger.error(f"[SessionExtractor] Error extracting IDs from response: {e}")
     
     async def _extract_from_text(self, text: str):
         """Extract IDs from text using regex patterns."""
-        if not text:
+        # Every ID is a hyphenated UUID, so text without a hyphen can't hold one
+        if not text or '-' not in text:
             return
         
         try:
             # Extract session ID
             if not self.session_id:
-                for pattern in self.extraction_patterns['session_id']:
-                    match = re.search(pattern, text, re.IGNORECASE)
-                    if match:
-                        self.session_id = match.group(1)
-                        logger.info(f"[SessionExtractor] Extracted session_id: {self.session_id}")
-                        break
+                match = self.extraction_patterns['session_id'].search(text)
+                if match:
+                    self.session_id = match.group(1)
+                    logger.info(f"[SessionExtractor] Extracted session_id: {self.session_id}")
             
             # Extract message ID
             if not self.message_id:
-                for pattern in self.extraction_patterns['message_id']:
-                    match = re.search(pattern, text, re.IGNORECASE)
-                    if match:
-                        self.message_id = match.group(1)
-                        logger.info(f"[SessionExtractor] Extracted message_id: {self.message_id}")
-                        break
-                        
+                match = self.extraction_patterns['message_id'].search(text)
+                if match:
+                    self.message_id = match.group(1)
+                    logger.info(f"[SessionExtractor] Extracted message_id: {self.message_id}")
+            
+            if self.session_id and self.message_id:
+                self._ids_ready.set()
+            
         except Exception as e:
             logger.error(f"[SessionExtractor] Error in pattern matching: {e}")
     
     async def extract_session_ids(self, mode: str = 'direct_chat', 
-                                battle_target: str = 'A') -> Tuple[Optional[str], Optional[str]]:
-        """Extract session and message IDs by interacting with LMArena."""
+                                battle_target: str = 'A',
+                                use_cache: bool = True) -> Tuple[Optional[str], Optional[str]]:
+        """Extract session and message IDs by interacting with LMArena.
+        
+        Concurrent calls for the same mode share one browser interaction.
+        """
+        key = (mode, battle_target, use_cache)
+        task = self._pending_extractions.get(key)
+        if task is None:
+            task = asyncio.create_task(self._extract_session_ids(mode, battle_target, use_cache))
+            self._pending_extractions[key] = task
+            task.add_done_callback(lambda _: self._pending_extractions.pop(key, None))
+        # Shielded so one caller being cancelled doesn't abort the others' extraction
+        return await asyncio.shield(task)
+    
+    async def _extract_session_ids(self, mode: str, battle_target: str,
+                                   use_cache: bool) -> Tuple[Optional[str], Optional[str]]:
+        """Run one extraction: cache lookup, then the browser round-trip."""
         try:
+            if use_cache:
+                cached = self._load_cached_ids(mode, battle_target)
+                if cached:
+                    self.session_id, self.message_id = cached
+                    self._ids_ready.set()
+                    logger.info(f"[SessionExtractor] Reusing cached IDs for mode: {mode}")
+                    return cached
+            
             logger.info(f"[SessionExtractor] Starting ID extraction for mode: {mode}")
             
             # Set up interception
             await self.setup_interception()
             
-            # Navigate to appropriate mode
-            await self._navigate_to_mode(mode, battle_target)
-            
-            # Send test message to trigger ID generation
-            success = await self._send_test_message()
-            
-            if not success:
-                logger.warning("[SessionExtractor] Failed to send test message")
-            
-            # Wait for IDs to be extracted
-            await self._wait_for_ids()
+            self._extracting = True
+            try:
+                # Navigate to appropriate mode
+                await self._navigate_to_mode(mode, battle_target)
+                
+                # Send test message to trigger ID generation
+                success = await self._send_test_message()
+                
+                if not success:
+                    logger.warning("[SessionExtractor] Failed to send test message")
+                
+                # Wait for IDs to be extracted
+                await self._wait_for_ids()
+            finally:
+                self._extracting = False
             
             # Validate extracted IDs
             if self.session_id and self.message_id:
                 if self._validate_ids(self.session_id, self.message_id):
                     logger.info(f"[SessionExtractor] Successfully extracted valid IDs")
+                    self._store_cached_ids(mode, battle_target)
                     return self.session_id, self.message_id
                 else:
                     logger.warning("[SessionExtractor] Extracted IDs failed validation")
@@ -253,6 +308,44 @@ class SessionExtractor:
             logger.error(f"[SessionExtractor] Error during ID extraction: {e}")
             return self._generate_fallback_ids()
     
+    def _cache_path(self, mode: str, battle_target: str) -> str:
+        """Path of the cache file for an instance, mode and battle target on LMArena."""
+        key = hashlib.sha1(f'{self.cache_scope}:{mode}:{battle_target}:{_LMARENA_URL}'.encode()).hexdigest()
+        return os.path.join(self.cache_dir, f'session_{key}.json')
+    
+    def _load_cached_ids(self, mode: str, battle_target: str) -> Optional[Tuple[str, str]]:
+        """Return still-fresh IDs from an earlier extraction, if any."""
+        if self.cache_ttl <= 0 or not self.cache_scope:
+            return None
+        try:
+            with open(self._cache_path(mode, battle_target), 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if time.time() - cached['timestamp'] > self.cache_ttl:
+                return None
+            if not self._validate_ids(cached['session_id'], cached['message_id']):
+                return None
+            return cached['session_id'], cached['message_id']
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"[SessionExtractor] Ignoring unreadable ID cache: {e}")
+            return None
+    
+    def _store_cached_ids(self, mode: str, battle_target: str):
+        """Save freshly extracted IDs so the next extraction can skip the browser."""
+        if self.cache_ttl <= 0 or not self.cache_scope:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self._cache_path(mode, battle_target), 'w', encoding='utf-8') as f:
+                json.dump({
+                    'session_id': self.session_id,
+                    'message_id': self.message_id,
+                    'timestamp': time.time()
+                }, f)
+        except Exception as e:
+            logger.warning(f"[SessionExtractor] Could not write ID cache: {e}")
+    
     async def _navigate_to_mode(self, mode: str, battle_target: str = 'A'):
         """Navigate to the specified mode in LMArena."""
         try:
@@ -264,13 +357,13 @@ class SessionExtractor:
                     logger.info("[SessionExtractor] Navigating to battle mode")
                     # This would need to be updated based on actual LMArena UI
                     # await self.page.click('text=Battle')
-                    await self.page.goto('https://lmarena.ai/?arena')
+                    await self.page.goto(f'{_LMARENA_URL}?arena')
                     await self.page.wait_for_load_state('networkidle')
             else:
                 # Navigate to direct chat mode
                 if 'direct' not in current_url and 'chat' not in current_url:
                     logger.info("[SessionExtractor] Navigating to direct chat mode")
-                    await self.page.goto('https://lmarena.ai/')
+                    await self.page.goto(_LMARENA_URL)
                     await self.page.wait_for_load_state('networkidle')
             
             # Wait for interface to be ready
@@ -282,23 +375,19 @@ class SessionExtractor:
     async def _send_test_message(self) -> bool:
         """Send a test message to trigger ID generation."""
         try:
-            # Find message input field
-            input_selectors = [
+            # Find message input field; one selector union waits for whichever appears first
+            input_selectors = ', '.join([
                 'textarea[placeholder*="message"]',
                 'textarea[placeholder*="Message"]',
                 'input[type="text"][placeholder*="message"]',
                 'textarea',
                 'input[type="text"]'
-            ]
+            ])
             
-            input_element = None
-            for selector in input_selectors:
-                try:
-                    input_element = await self.page.wait_for_selector(selector, timeout=5000)
-                    if input_element:
-                        break
-                except:
-                    continue
+            try:
+                input_element = await self.page.wait_for_selector(input_selectors, timeout=5000)
+            except:
+                input_element = None
             
             if not input_element:
                 logger.error("[SessionExtractor] Could not find message input field")
@@ -334,23 +423,17 @@ class SessionExtractor:
     
     async def _wait_for_ids(self, timeout: int = 10):
         """Wait for session and message IDs to be extracted."""
-        start_time = asyncio.get_event_loop().time()
-        
-        while (asyncio.get_event_loop().time() - start_time) < timeout:
-            if self.session_id and self.message_id:
-                return
-            await asyncio.sleep(0.5)
-        
-        logger.warning(f"[SessionExtractor] Timeout waiting for ID extraction after {timeout}s")
+        try:
+            await asyncio.wait_for(self._ids_ready.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"[SessionExtractor] Timeout waiting for ID extraction after {timeout}s")
     
     def _validate_ids(self, session_id: str, message_id: str) -> bool:
         """Validate extracted IDs."""
         try:
             # Check if they look like UUIDs
-            uuid_pattern = r'^[a-f0-9]{8}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{4}-[a-f0-9]{12}$'
-            
-            session_valid = bool(re.match(uuid_pattern, session_id, re.IGNORECASE))
-            message_valid = bool(re.match(uuid_pattern, message_id, re.IGNORECASE))
+            session_valid = self._looks_like_uuid(session_id)
+            message_valid = self._looks_like_uuid(message_id)
             
             # They should be different
             different = session_id != message_id
@@ -361,6 +444,13 @@ class SessionExtractor:
             logger.error(f"[SessionExtractor] Error validating IDs: {e}")
             return False
     
+    @staticmethod
+    def _looks_like_uuid(value: str) -> bool:
+        """Check the 8-4-4-4-12 hex layout of a UUID without a regex."""
+        if len(value) != 36 or value[8] != '-' or value[13] != '-' or value[18] != '-' or value[23] != '-':
+            return False
+        return _HEX_DIGITS.issuperset(value.replace('-', ''))
+    
     def _generate_fallback_ids(self) -> Tuple[str, str]:
         """Generate fallback UUIDs when extraction fails."""
         session_id = str(uuid.uuid4())
@@ -374,17 +464,23 @@ class SessionExtractor:
         # Clear existing IDs
         self.session_id = None
         self.message_id = None
+        self._ids_ready.clear()
         self.intercepted_requests.clear()
         self.intercepted_responses.clear()
         
-        # Extract new IDs
-        return await self.extract_session_ids()
+        # Extract new IDs; the cache would hand back the ones being replaced
+        return await self.extract_session_ids(use_cache=False)
+    
+    @staticmethod
+    def _render_entry(entry: dict) -> dict:
+        """Copy an intercept log entry with its epoch timestamp as a datetime."""
+        return {**entry, 'timestamp': datetime.fromtimestamp(entry['timestamp'])}
     
     def get_extraction_history(self) -> Dict[str, Any]:
         """Get history of intercepted requests and responses."""
         return {
-            'requests': self.intercepted_requests[-50:],  # Last 50 requests
-            'responses': self.intercepted_responses[-50:],  # Last 50 responses
+            'requests': [self._render_entry(entry) for entry in self.intercepted_requests],  # Last 50 requests
+            'responses': [self._render_entry(entry) for entry in self.intercepted_responses],  # Last 50 responses
             'current_session_id': self.session_id,
             'current_message_id': self.message_id,
             'extraction_time': datetime.now().isoformat()
@@ -2,36 +2,75 @@
 import os
 import shutil
 import time
-import subprocess
 import sys
 import json
 import re
 
+try:
+    from orjson import loads as _loads
+except ImportError:
+    _loads = json.loads
+
+# JSONC comment syntax, stripped before the content is handed to json
+_LINE_COMMENT = re.compile(r'//.*')
+_BLOCK_COMMENT = re.compile(r'/\*.*?\*/', re.DOTALL)
+# A "key": scalar pair; group 1 is everything up to the value, group 2 the key
+_KEY_VALUE = re.compile(r'("([^"]+)"\s*:\s*)(?:"(?:[^"\\]|\\.)*"|true|false|null|-?[\d.]+)')
+
 def load_jsonc_values(path):
     """Load data from a .jsonc file, ignoring comments, returning only key-value pairs."""
     try:
         with open(path, 'r', encoding='utf-8') as f:
             content = f.read()
-        content = re.sub(r'//.*', '', content)
-        content = re.sub(r'/\*.*?\*/', '', content, flags=re.DOTALL)
-        return json.loads(content)
+        content = _LINE_COMMENT.sub('', content)
+        content = _BLOCK_COMMENT.sub('', content)
+        return _loads(content)
     except (FileNotFoundError, json.JSONDecodeError, Exception) as e:
         print(f"Error loading or parsing values from {path}: {e}")
         return None
 
+def merge_config_values(content, values):
+    """Write scalar values into a JSONC template in one pass, leaving comments and layout intact."""
+    replacements = {
+        key: json.dumps(value, ensure_ascii=False)
+        for key, value in values.items()
+        if not isinstance(value, (dict, list))
+    }
+    
+    def replace(match):
+        replacement = replacements.get(match.group(2))
+        return match.group(0) if replacement is None else match.group(1) + replacement
+    
+    return _KEY_VALUE.sub(replace, content)
+
+def move_or_copy(src, dst):
+    """Move a file into place with a rename, copying only when src and dst are on different filesystems."""
+    # The update folder is deleted afterwards, so its files can be moved instead of copied
+    try:
+        os.replace(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+    return dst
+
 def get_all_relative_paths(directory):
     """Get a set of relative paths for all files and empty folders in a directory."""
     paths = set()
-    for root, dirs, files in os.walk(directory):
-        # Add files
-        for name in files:
-            path = os.path.join(root, name)
-            paths.add(os.path.relpath(path, directory))
+    # Each folder is scanned exactly once, which also tells us whether it is empty
+    pending = ['']
+    while pending:
+        relative_dir = pending.pop()
+        is_empty = True
+        with os.scandir(os.path.join(directory, relative_dir)) as entries:
+            for entry in entries:
+                is_empty = False
+                relative_path = os.path.join(relative_dir, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(relative_path)
+                else:
+                    paths.add(relative_path)
         # Add empty folders
-        for name in dirs:
-            dir_path = os.path.join(root, name)
-            if not os.listdir(dir_path):
-                paths.add(os.path.relpath(dir_path, directory) + os.sep)
+        if is_empty and relative_dir:
+            paths.add(relative_dir + os.sep)
     return paths
 
 def main():
@@ -117,9 +156,9 @@ def main():
                 continue # Skip model endpoint mapping file, preserve user's local version
 
             if os.path.isdir(s):
-                shutil.copytree(s, d, dirs_exist_ok=True)
+                shutil.copytree(s, d, copy_function=move_or_copy, dirs_exist_ok=True)
             else:
-                shutil.copy2(s, d)
+                move_or_copy(s, d)
         print("File copying successful.")
 
     except Exception as e:
@@ -137,17 +176,7 @@ def main():
             new_version = new_version_values.get("version", "unknown")
             old_config_values["version"] = new_version
 
-            for key, value in old_config_values.items():
-                if isinstance(value, str):
-                    replacement_value = f'"{value}"'
-                elif isinstance(value, bool):
-                    replacement_value = str(value).lower()
-                else:
-                    replacement_value = str(value)
-                
-                pattern = re.compile(f'("{key}"\s*:\s*)(?:".*?"|true|false|[\d\.]+)')
-                if pattern.search(new_config_content):
-                    new_config_content = pattern.sub(f'\\g<1>{replacement_value}', new_config_content)
+            new_config_content = merge_config_values(new_config_content, old_config_values)
 
             with open(old_config_path, 'w', encoding='utf-8') as f:
                 f.write(new_config_content)
@@ -171,6 +200,9 @@ def main():
     # 10. Restart main program
     print("\n[*] Restarting main program...")
     try:
+        # Only needed for this last step
+        import subprocess
+        
         main_script_path = os.path.join(destination_dir, "api_server.py")
         if not os.path.exists(main_script_path):
              print(f"Error: Main program script {main_script_path} not found.")
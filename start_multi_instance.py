@@ -6,12 +6,116 @@ This script helps users start the new multi-instance LMArenaBridge system
 with proper dependency checking and configuration validation.
 """
 
+import functools
+import importlib.util
+import io
 import os
 import sys
 import subprocess
-import json
 import re
-from pathlib import Path
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    # C-accelerated JSON5 parser; it reads comments natively
+    import pyjson5
+except ImportError:
+    pyjson5 = None
+
+try:
+    # Compiles a schema into plain Python checks
+    import fastjsonschema
+except ImportError:
+    fastjsonschema = None
+
+CONFIG_PATH = 'config.jsonc'
+# Records the Playwright version whose browsers were last installed successfully
+PLAYWRIGHT_SENTINEL = '.playwright_checked'
+# Signature of the last fully successful startup; a match lets the slow checks be skipped
+STARTUP_CACHE = '.startup_cache.json'
+STARTUP_CACHE_TTL = 3600  # seconds
+
+# Shape of the settings the launcher and server rely on
+CONFIG_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "instances": {
+            "type": "object",
+            "properties": {
+                "initial_count": {"type": "integer", "minimum": 1},
+                "min_instances": {"type": "integer", "minimum": 0},
+                "max_instances": {"type": "integer", "minimum": 1}
+            }
+        },
+        "gui": {
+            "type": "object",
+            "properties": {
+                "enabled": {"type": "boolean"},
+                "host": {"type": "string"},
+                "port": {"type": "integer", "minimum": 1, "maximum": 65535}
+            }
+        }
+    }
+}
+
+# A string literal or a comment, matched together so "//" inside strings is never taken as a comment
+_JSONC_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|//[^\n]*|/\*.*?(?:\*/|\Z)', re.DOTALL)
+
+def _keep_strings(match):
+    """Substitution for _JSONC_TOKEN: keep string literals, drop comments."""
+    token = match.group(0)
+    return token if token[0] == '"' else ''
+
+def _strip_jsonc_comments(content):
+    """Remove // and /* */ comments in one pass, leaving string literals (such as URLs) intact."""
+    return _JSONC_TOKEN.sub(_keep_strings, content)
+
+def _parse_jsonc(content):
+    """Parse JSONC text into a dict."""
+    if pyjson5 is not None:
+        return pyjson5.loads(content)
+    # Only needed without pyjson5
+    import json
+    return json.loads(_strip_jsonc_comments(content))
+
+@functools.lru_cache(maxsize=4)
+def _parse_config(path, mtime):
+    """Parse a JSONC file; cached per modification time, so edits are picked up."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return _parse_jsonc(f.read())
+
+def _load_config(path=CONFIG_PATH):
+    """Load the config once per startup; every check reads the same parsed dict."""
+    return _parse_config(path, os.stat(path).st_mtime)
+
+class AppConfig:
+    """The settings the launcher reads, with their defaults in one place."""
+    host = 'localhost'
+    gui_port = 5104
+    gui_enabled = True
+    initial_instances = 1
+    max_instances = 5
+    
+    def __init__(self, config):
+        """Pick the launcher's settings out of a parsed config.jsonc."""
+        gui_config = config.get('gui', {})
+        instances_config = config.get('instances', {})
+        self.host = gui_config.get('host', self.host)
+        self.gui_port = gui_config.get('port', self.gui_port)
+        self.gui_enabled = gui_config.get('enabled', self.gui_enabled)
+        self.initial_instances = instances_config.get('initial_count', self.initial_instances)
+        self.max_instances = instances_config.get('max_instances', self.max_instances)
+
+@functools.lru_cache(maxsize=4)
+def _parse_app_config(path, mtime):
+    """AppConfig for one version of the config file."""
+    return AppConfig(_parse_config(path, mtime))
+
+def _load_app_config(path=CONFIG_PATH):
+    """Load the launcher's settings, sharing the parse with _load_config."""
+    return _parse_app_config(path, os.stat(path).st_mtime)
 
 def check_python_version():
     """Check if Python version is compatible."""
@@ -22,6 +126,19 @@ def check_python_version():
     print(f"✅ Python version: {sys.version.split()[0]}")
     return True
 
+def _pip_install(packages):
+    """Install packages with pip, in-process when possible to skip a second interpreter start."""
+    args = ['install'] + packages
+    try:
+        # pip's internal entry point isn't a stable API; fall back to a subprocess if it moves
+        from pip._internal.cli.main import main as pip_main
+    except ImportError:
+        subprocess.check_call([sys.executable, '-m', 'pip'] + args)
+        return
+    returncode = pip_main(args)
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, ['pip'] + args)
+
 def check_dependencies():
     """Check if required dependencies are installed."""
     required_packages = [
@@ -38,20 +155,30 @@ def check_dependencies():
     
     missing_packages = []
     
+    # One walk over the installed distributions' metadata covers every package; importing
+    # them here would run their heavy module code in a launcher that never uses them
+    from importlib.metadata import distributions
+    installed = {
+        re.sub(r'[-_.]+', '-', name).lower()
+        for name in (dist.metadata['Name'] for dist in distributions())
+        if name
+    }
+    
+    lines = []
     for package in required_packages:
-        try:
-            __import__(package)
-            print(f"✅ {package}")
-        except ImportError:
+        if package in installed:
+            lines.append(f"✅ {package}")
+        else:
             missing_packages.append(package)
-            print(f"❌ {package} (missing)")
+            lines.append(f"❌ {package} (missing)")
+    sys.stdout.write('\n'.join(lines) + '\n')
     
     if missing_packages:
         print(f"\n📦 Installing missing packages: {', '.join(missing_packages)}")
+        # pip writes to the console directly; get our lines out first
+        sys.stdout.flush()
         try:
-            subprocess.check_call([
-                sys.executable, '-m', 'pip', 'install'
-            ] + missing_packages)
+            _pip_install(missing_packages)
             print("✅ All dependencies installed successfully")
         except subprocess.CalledProcessError:
             print("❌ Failed to install dependencies")
@@ -60,23 +187,74 @@ def check_dependencies():
     
     return True
 
+def _playwright_browsers_dir():
+    """Directory Playwright installs its browsers into on this platform."""
+    custom = os.environ.get('PLAYWRIGHT_BROWSERS_PATH')
+    if custom and custom != '0':
+        return custom
+    home = os.path.expanduser('~')
+    if sys.platform == 'win32':
+        return os.path.join(os.environ.get('LOCALAPPDATA', os.path.join(home, 'AppData', 'Local')), 'ms-playwright')
+    if sys.platform == 'darwin':
+        return os.path.join(home, 'Library', 'Caches', 'ms-playwright')
+    return os.path.join(home, '.cache', 'ms-playwright')
+
+def _playwright_version():
+    """Installed Playwright package version, or None."""
+    try:
+        from importlib.metadata import version
+        return version('playwright')
+    except Exception:
+        return None
+
+def _chromium_ready():
+    """True when Chromium is on disk and was installed for the current Playwright version."""
+    try:
+        with open(PLAYWRIGHT_SENTINEL, 'r', encoding='utf-8') as f:
+            checked_version = f.read().strip()
+    except OSError:
+        return False
+    if not checked_version or checked_version != _playwright_version():
+        return False
+    try:
+        with os.scandir(_playwright_browsers_dir()) as entries:
+            return any(entry.name.startswith('chromium-') for entry in entries)
+    except OSError:
+        return False
+
+def _mark_chromium_ready():
+    """Remember that browsers are installed for the current Playwright version."""
+    version = _playwright_version()
+    if not version:
+        return
+    try:
+        with open(PLAYWRIGHT_SENTINEL, 'w', encoding='utf-8') as f:
+            f.write(version)
+    except OSError:
+        pass
+
 def check_playwright_browsers():
     """Check if Playwright browsers are installed."""
     try:
-        result = subprocess.run([
-            sys.executable, '-m', 'playwright', 'install', '--help'
-        ], capture_output=True, text=True)
-        
-        if result.returncode == 0:
+        # Locating the package is enough; no need to start an interpreter to ask it for --help
+        if importlib.util.find_spec('playwright') is not None:
             print("✅ Playwright is available")
             
+            # The install below spawns a process and may hit the network; skip it when
+            # this Playwright version's Chromium is already in place
+            if _chromium_ready():
+                print("✅ Playwright browsers ready")
+                return True
+            
             # Check if browsers are installed
             print("📥 Installing/updating Playwright browsers...")
+            sys.stdout.flush()
             install_result = subprocess.run([
                 sys.executable, '-m', 'playwright', 'install', 'chromium'
             ], capture_output=True, text=True)
             
             if install_result.returncode == 0:
+                _mark_chromium_ready()
                 print("✅ Playwright browsers ready")
                 return True
             else:
@@ -91,36 +269,56 @@ def check_playwright_browsers():
         print("❌ Playwright not found")
         return False
 
+_SCHEMA_TYPES = {
+    "object": dict,
+    "string": str,
+    "boolean": bool,
+    "integer": int
+}
+
+def _check_schema(value, schema, path='config'):
+    """Minimal validator for CONFIG_SCHEMA, used when fastjsonschema isn't installed."""
+    expected = schema.get("type")
+    # bool is an int subclass, but true/false is not a valid integer setting
+    if expected and (not isinstance(value, _SCHEMA_TYPES[expected])
+                     or (expected == "integer" and isinstance(value, bool))):
+        raise ValueError(f"{path} must be {expected}")
+    if "minimum" in schema and value < schema["minimum"]:
+        raise ValueError(f"{path} must be >= {schema['minimum']}")
+    if "maximum" in schema and value > schema["maximum"]:
+        raise ValueError(f"{path} must be <= {schema['maximum']}")
+    for key, sub_schema in schema.get("properties", {}).items():
+        if key in value:
+            _check_schema(value[key], sub_schema, f"{path}.{key}")
+
+@functools.lru_cache(maxsize=1)
+def _config_validator():
+    """Build the config validator once; raises ValueError on a schema violation."""
+    if fastjsonschema is not None:
+        return fastjsonschema.compile(CONFIG_SCHEMA)
+    return lambda config: _check_schema(config, CONFIG_SCHEMA)
+
 def validate_config():
     """Validate configuration file."""
-    config_path = Path('config.jsonc')
-    
-    if not config_path.exists():
+    if not os.path.exists(CONFIG_PATH):
         print("❌ config.jsonc not found")
         return False
     
     try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            # Remove comments for JSON parsing
-            json_content = re.sub(r'//.*', '', content)
-            json_content = re.sub(r'/\*.*?\*/', '', json_content, flags=re.DOTALL)
-            config = json.loads(json_content)
+        _config_validator()(_load_config())
+        app_config = _load_app_config()
         
         print("✅ Configuration file is valid")
         
         # Check multi-instance settings
-        instances_config = config.get('instances', {})
-        gui_config = config.get('gui', {})
-        
-        print(f"   - Initial instances: {instances_config.get('initial_count', 1)}")
-        print(f"   - Max instances: {instances_config.get('max_instances', 5)}")
-        print(f"   - GUI enabled: {gui_config.get('enabled', True)}")
-        print(f"   - GUI port: {gui_config.get('port', 5104)}")
+        print(f"   - Initial instances: {app_config.initial_instances}")
+        print(f"   - Max instances: {app_config.max_instances}")
+        print(f"   - GUI enabled: {app_config.gui_enabled}")
+        print(f"   - GUI port: {app_config.gui_port}")
         
         return True
         
-    except json.JSONDecodeError as e:
+    except ValueError as e:
         print(f"❌ Invalid configuration file: {e}")
         return False
     except Exception as e:
@@ -129,27 +327,29 @@ def validate_config():
 
 def check_ports():
     """Check if required ports are available."""
-    import socket
-    
     # Get GUI port from config
     try:
-        with open('config.jsonc', 'r', encoding='utf-8') as f:
-            content = f.read()
-            json_content = re.sub(r'//.*', '', content)
-            json_content = re.sub(r'/\*.*?\*/', '', json_content, flags=re.DOTALL)
-            config = json.loads(json_content)
-        
-        gui_port = config.get('gui', {}).get('port', 5104)
+        gui_port = _load_app_config().gui_port
     except:
-        gui_port = 5104
+        gui_port = AppConfig.gui_port
     
     def is_port_available(port):
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            try:
+        # Bind the way the server will (SO_REUSEADDR, so TIME_WAIT leftovers don't count)
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
                 s.bind(('localhost', port))
-                return True
-            except OSError:
+                s.listen(1)
+        except (OSError, OverflowError):
+            return False
+        
+        # A bindable port can still be served elsewhere (e.g. an IPv6 listener); only a
+        # refused connection proves it is free
+        try:
+            with socket.create_connection(('localhost', port), timeout=0.1):
                 return False
+        except OSError:
+            return True
     
     if is_port_available(gui_port):
         print(f"✅ Port {gui_port} is available")
@@ -169,85 +369,187 @@ def create_directories():
         'modules'
     ]
     
+    # One stat per leaf when the tree already exists; makedirs walks the parents only when needed
     for directory in directories:
-        Path(directory).mkdir(parents=True, exist_ok=True)
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
     
     print("✅ Directory structure verified")
 
 def show_startup_info():
     """Show startup information."""
     try:
-        with open('config.jsonc', 'r', encoding='utf-8') as f:
-            content = f.read()
-            json_content = re.sub(r'//.*', '', content)
-            json_content = re.sub(r'/\*.*?\*/', '', json_content, flags=re.DOTALL)
-            config = json.loads(json_content)
-        
-        gui_config = config.get('gui', {})
-        host = gui_config.get('host', 'localhost')
-        port = gui_config.get('port', 5104)
+        app_config = _load_app_config()
+        host = app_config.host
+        port = app_config.gui_port
         
-        print("\n" + "="*60)
-        print("🚀 LMArenaBridge Multi-Instance System")
-        print("="*60)
-        print(f"📊 Dashboard: http://{host}:{port}/gui/dashboard")
-        print(f"🔗 API Endpoint: http://{host}:{port}/v1/chat/completions")
-        print(f"📡 WebSocket: ws://{host}:{port}/gui/ws")
-        print("="*60)
-        print("\n🎯 Features:")
-        print("   • Multiple browser instances with automatic scaling")
-        print("   • Real-time health monitoring and failover")
-        print("   • Web-based dashboard for management")
-        print("   • Load balancing with multiple strategies")
-        print("   • Backward compatibility with existing clients")
-        print("\n⚡ Quick Start:")
-        print("   1. Open the dashboard in your browser")
-        print("   2. Monitor instance status and performance")
-        print("   3. Use the same API endpoint as before")
-        print("   4. Enjoy improved reliability and performance!")
-        print("\n" + "="*60)
+        # One write for the whole banner instead of a console write per line
+        sys.stdout.write('\n'.join([
+            "\n" + "="*60,
+            "🚀 LMArenaBridge Multi-Instance System",
+            "="*60,
+            f"📊 Dashboard: http://{host}:{port}/gui/dashboard",
+            f"🔗 API Endpoint: http://{host}:{port}/v1/chat/completions",
+            f"📡 WebSocket: ws://{host}:{port}/gui/ws",
+            "="*60,
+            "\n🎯 Features:",
+            "   • Multiple browser instances with automatic scaling",
+            "   • Real-time health monitoring and failover",
+            "   • Web-based dashboard for management",
+            "   • Load balancing with multiple strategies",
+            "   • Backward compatibility with existing clients",
+            "\n⚡ Quick Start:",
+            "   1. Open the dashboard in your browser",
+            "   2. Monitor instance status and performance",
+            "   3. Use the same API endpoint as before",
+            "   4. Enjoy improved reliability and performance!",
+            "\n" + "="*60
+        ]) + '\n')
         
     except Exception as e:
         print(f"⚠️  Could not load configuration: {e}")
 
+class _ThreadBufferedStdout:
+    """sys.stdout stand-in that buffers output per worker thread, so parallel checks don't interleave."""
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+    
+    def write(self, text):
+        buffer = getattr(self.local, 'buffer', None)
+        return (self.stream if buffer is None else buffer).write(text)
+    
+    def flush(self):
+        self.stream.flush()
+    
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+def run_check(check_name, check_func):
+    """Run one check, reporting an exception as a failure."""
+    try:
+        return bool(check_func())
+    except Exception as e:
+        print(f"❌ Error during {check_name} check: {e}")
+        return False
+
+def _run_buffered(stdout, check_name, check_func):
+    """Run a check on a worker thread; returns its result and everything it printed."""
+    stdout.local.buffer = io.StringIO()
+    try:
+        passed = run_check(check_name, check_func)
+        return passed, stdout.local.buffer.getvalue()
+    finally:
+        stdout.local.buffer = None
+
+def _startup_signature():
+    """Hash of everything the cacheable checks depend on."""
+    import hashlib
+    digest = hashlib.sha256()
+    with open(CONFIG_PATH, 'rb') as f:
+        digest.update(f.read())
+    # The executable tells venvs built from the same interpreter apart
+    digest.update(f'{sys.executable}\0{sys.version}'.encode())
+    try:
+        digest.update(str(os.stat('requirements.txt').st_mtime).encode())
+    except OSError:
+        pass
+    return digest.hexdigest()
+
+def _checks_cached(signature):
+    """True when the last successful startup had this signature and is recent enough."""
+    import json
+    try:
+        with open(STARTUP_CACHE, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        return cached['hash'] == signature and time.time() - cached['ts'] < STARTUP_CACHE_TTL
+    except (OSError, ValueError, KeyError, TypeError):
+        return False
+
+def _save_checks_cache(signature):
+    """Record a fully successful startup."""
+    import json
+    try:
+        with open(STARTUP_CACHE, 'w', encoding='utf-8') as f:
+            json.dump({'hash': signature, 'ts': time.time()}, f)
+    except OSError:
+        pass
+
 def main():
     """Main startup function."""
+    # Block-buffer the console; output is flushed before anything that must show it promptly
+    if hasattr(sys.stdout, 'reconfigure'):
+        sys.stdout.reconfigure(line_buffering=False, write_through=False)
+    
     print("🔍 LMArenaBridge Multi-Instance System - Startup Check")
     print("="*60)
     
-    # Run all checks
+    # Run all checks; independent ones start at once on worker threads, while the
+    # dependency and browser checks, which may install things, run here in turn
     checks = [
-        ("Python Version", check_python_version),
-        ("Dependencies", check_dependencies),
-        ("Playwright Browsers", check_playwright_browsers),
-        ("Configuration", validate_config),
-        ("Port Availability", check_ports),
-        ("Directory Structure", lambda: (create_directories(), True)[1])
+        ("Python Version", check_python_version, True),
+        ("Dependencies", check_dependencies, False),
+        ("Playwright Browsers", check_playwright_browsers, False),
+        ("Configuration", validate_config, True),
+        ("Port Availability", check_ports, True),
+        ("Directory Structure", lambda: (create_directories(), True)[1], True)
     ]
     
+    try:
+        signature = _startup_signature()
+    except OSError:
+        signature = None
+    
+    cached = signature is not None and _checks_cached(signature)
+    if cached:
+        # Nothing the other checks look at has changed; the port must always be checked live
+        print("\n⚡ Environment unchanged since the last successful startup, skipping the other checks")
+        checks = [check for check in checks if check[0] == "Port Availability"]
+    
     all_passed = True
     
-    for check_name, check_func in checks:
-        print(f"\n🔍 Checking {check_name}...")
-        try:
-            if not check_func():
-                all_passed = False
-        except Exception as e:
-            print(f"❌ Error during {check_name} check: {e}")
-            all_passed = False
+    stdout = sys.stdout = _ThreadBufferedStdout(sys.stdout)
+    try:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = {
+                check_name: executor.submit(_run_buffered, stdout, check_name, check_func)
+                for check_name, check_func, parallel in checks if parallel
+            }
+            
+            # Report in the original order
+            for check_name, check_func, parallel in checks:
+                print(f"\n🔍 Checking {check_name}...")
+                if parallel:
+                    passed, output = futures[check_name].result()
+                    print(output, end='')
+                else:
+                    passed = run_check(check_name, check_func)
+                if not passed:
+                    all_passed = False
+    finally:
+        sys.stdout = stdout.stream
     
     print("\n" + "="*60)
     
     if all_passed:
+        # A failed browser install still lets startup continue, but must be retried next time
+        if signature is not None and not cached and _chromium_ready():
+            _save_checks_cache(signature)
         print("✅ All checks passed! Starting multi-instance system...")
         show_startup_info()
         
         # Start the server
         try:
             print("\n🚀 Starting server...")
-            subprocess.run([
-                sys.executable, 'api_server_multi.py'
-            ])
+            server_command = [sys.executable, 'api_server_multi.py']
+            sys.stdout.flush()
+            if os.name == 'posix':
+                # Become the server instead of waiting on it: no idle launcher left in
+                # memory and Ctrl+C goes straight to the server
+                os.execv(sys.executable, server_command)
+            # Windows emulates exec with a new process and returns to the shell early
+            subprocess.run(server_command)
         except KeyboardInterrupt:
             print("\n\n👋 Server stopped by user")
         except Exception as e: